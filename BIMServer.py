@@ -20,8 +20,9 @@
 #*                                                                         *
 #***************************************************************************
 
-import FreeCAD, os, time, tempfile, base64, Draft
+import FreeCAD, os, time, tempfile, Draft
 from PySide import QtCore, QtGui
+from WebToolsUtils import Worker
 
 if FreeCAD.GuiUp:
     import FreeCADGui
@@ -64,9 +65,187 @@ class CommandBimServer:
             FreeCADGui.Control.showDialog(BimServerTaskPanel())
 
 
+class ProgressPoller(QtCore.QThread):
+
+    '''Follows a long BimServer action (check-in, download...) in a
+    background thread, so the GUI stays responsive meanwhile'''
+
+    progress = QtCore.Signal(int,str) # percentage (-1 if unknown), title
+    done = QtCore.Signal(bool,str) # success, error message
+
+    def __init__(self,client,topicId,interval=1000):
+        QtCore.QThread.__init__(self)
+        self.client = client
+        self.topicId = topicId
+        self.interval = interval # milliseconds
+
+    def run(self):
+        errors = 0
+        while not self.isInterruptionRequested():
+            try:
+                state = self.client.getProgress(self.topicId)
+            except Exception as e:
+                errors += 1
+                if errors >= 5:
+                    self.done.emit(False,str(e))
+                    return
+            else:
+                errors = 0
+                self.progress.emit(int(state.get("progress",-1)),state.get("title") or "")
+                if state.get("state") == "FINISHED":
+                    self.cleanup()
+                    self.done.emit(True,"")
+                    return
+                elif state.get("state") == "AS_ERROR":
+                    self.cleanup()
+                    self.done.emit(False,"; ".join(state.get("errors") or []))
+                    return
+            self.msleep(self.interval)
+
+    def cleanup(self):
+        try:
+            self.client.cleanupLongAction(self.topicId)
+        except Exception:
+            pass
+
+
+class ExportTracker:
+
+    '''Remembers the state of the objects under a root object at the time
+    of its last successful check-in to a BimServer project, so the next
+    check-in only needs to export the storeys containing the objects
+    changed since then, and merge them into the previous revision'''
+
+    # spatial containers, a change to them requires a full export
+    Containers = ["Site","Building","Floor","BuildingPart","IfcSite","IfcBuilding","IfcBuildingStorey","Project","Group"]
+
+    # the containers exported whole by a partial export
+    Storeys = ["Floor","IfcBuildingStorey"]
+
+    # the spatial parents the exporter creates above exported storeys
+    Parents = ["IfcProject","IfcSite","IfcBuilding"]
+
+    # above this fraction of changed objects, a full export is not much slower
+    MaxRatio = 0.5
+
+    def __init__(self,cache,poid,root):
+        import hashlib
+        self.cache = cache
+        self.root = root
+        self.name = None
+        if root.Document.FileName:
+            # documents of different files can have the same name
+            key = hashlib.sha1(root.Document.FileName.encode("utf-8")).hexdigest()[:16]
+            self.name = os.path.join("exports",str(poid)+"-"+key+"-"+root.Name+".json")
+        self.parents = None
+        self.update()
+
+    def update(self):
+        "records the current state of the objects under the root"
+        self.objects = dict([(o.Name,o) for o in [self.root]+self.root.OutListRecursive])
+        self.signatures = dict([(n,self.getSignature(o)) for n,o in self.objects.items()])
+
+    def getSignature(self,obj):
+        import hashlib
+        h = hashlib.sha1(obj.Content.encode("utf-8"))
+        if hasattr(obj,"Shape") and not obj.Shape.isNull():
+            # catch shapes changed by scripts, not only through properties
+            h.update(str(obj.Shape.BoundBox).encode("utf-8"))
+        return h.hexdigest()
+
+    def isStorey(self,obj):
+        if Draft.getType(obj) == "BuildingPart":
+            return getattr(obj,"IfcType","") == "Building Storey"
+        return Draft.getType(obj) in self.Storeys
+
+    def getStorey(self,obj):
+        "returns the storey under the root containing the given object, or None"
+        todo = [obj]
+        seen = set()
+        while todo:
+            o = todo.pop()
+            if o.Name in seen:
+                continue
+            seen.add(o.Name)
+            if self.isStorey(o):
+                return o
+            todo.extend([p for p in o.InList if p.Name in self.objects])
+        return None
+
+    def getExportList(self,full=False):
+        "returns the list of objects to export, and whether they must be merged"
+        previous = None
+        if self.cache and self.name and not full:
+            previous = self.cache.read(self.name)
+        if not (previous and previous.get("signatures") and previous.get("parents")):
+            return [self.root],False
+        self.parents = previous["parents"]
+        signatures = previous["signatures"]
+        if [n for n in signatures if not n in self.signatures]:
+            # deleted objects can't be removed by a merge
+            return [self.root],False
+        changed = [n for n,sig in self.signatures.items() if signatures.get(n) != sig]
+        if not changed:
+            return [],True
+        # add the objects depending on the changed ones, for ex. walls
+        # based on a changed sketch, but not the containers holding them
+        affected = set(changed)
+        todo = list(changed)
+        while todo:
+            for o in self.objects[todo.pop()].InList:
+                if (o.Name in self.objects) and (not o.Name in affected) and (Draft.getType(o) not in self.Containers):
+                    affected.add(o.Name)
+                    todo.append(o.Name)
+        if len(affected) > self.MaxRatio*len(self.objects):
+            return [self.root],False
+        if [n for n in affected if Draft.getType(self.objects[n]) in self.Containers]:
+            return [self.root],False
+        # loose objects would be exported in a new default spatial
+        # structure, so whole storeys are exported instead
+        storeys = []
+        for n in affected:
+            storey = self.getStorey(self.objects[n])
+            if storey is None:
+                return [self.root],False
+            if not storey in storeys:
+                storeys.append(storey)
+        return storeys,True
+
+    def setParents(self,filename,merge):
+        """after a full export, records the ids of the spatial parents of the
+        exported file. After a partial export, gives the parents created by
+        the exporter the ids of the full export, so the merge on the server
+        updates them instead of adding a second spatial structure. Returns
+        False if the parents of the partial export can't all be matched"""
+        import ifcopenshell
+        f = ifcopenshell.open(filename)
+        if not merge:
+            self.parents = {}
+            for t in self.Parents:
+                entities = f.by_type(t)
+                if len(entities) == 1:
+                    self.parents[t] = [entities[0].GlobalId,entities[0].Name]
+            return True
+        for t in self.Parents:
+            entities = f.by_type(t)
+            if entities and ((len(entities) > 1) or (not t in self.parents)):
+                return False
+        for t in self.Parents:
+            for e in f.by_type(t):
+                e.GlobalId,e.Name = self.parents[t]
+        f.write(filename)
+        return True
+
+    def save(self):
+        "stores the recorded state, to be called after a successful check-in"
+        if self.cache and self.name and self.parents:
+            self.cache.write(self.name,{"signatures":self.signatures,"parents":self.parents})
+
+
 class BimServerTaskPanel:
 
-    '''The TaskPanel for the BimServer command'''
+    '''The TaskPanel for the BimServer command. All the server requests
+    run in a background Worker, so the GUI never waits for the network'''
 
     def __init__(self):
         self.form = FreeCADGui.PySideUic.loadUi(os.path.join(os.path.dirname(__file__),"ui","TaskBimServer.ui"))
@@ -77,9 +256,15 @@ class BimServerTaskPanel:
         QtCore.QObject.connect(self.form.comboProjects, QtCore.SIGNAL("currentIndexChanged(int)"), self.getRevisions)
         QtCore.QObject.connect(self.form.buttonOpen, QtCore.SIGNAL("clicked()"), self.openFile)
         QtCore.QObject.connect(self.form.buttonUpload, QtCore.SIGNAL("clicked()"), self.uploadFile)
+        QtCore.QObject.connect(self.form.buttonCancel, QtCore.SIGNAL("clicked()"), self.cancel)
+        self.form.progressBar.hide()
+        self.form.buttonCancel.hide()
+        self.Cancelled = False
+        self.Worker = Worker()
         self.prefs = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Arch")
         self.Projects = []
         self.Revisions = []
+        self.RevisionsRequest = 0
         self.RootObjects = Draft.getObjectsOfType(FreeCAD.ActiveDocument.Objects,"Site")+Draft.getObjectsOfType(FreeCAD.ActiveDocument.Objects,"Building")
         self.RootObjects += Draft.getObjectsOfType(FreeCAD.ActiveDocument.Objects,"IfcSite")+Draft.getObjectsOfType(FreeCAD.ActiveDocument.Objects,"IfcBuilding")
         for o in self.RootObjects:
@@ -87,14 +272,37 @@ class BimServerTaskPanel:
         self.setLogged(False)
         url,token = self.getPrefs()
         if url and token:
+            # show what we knew last time, then refresh it
+            projects = self.getClient().getCachedProjects()
+            if projects:
+                self.setProjects(projects)
             self.getProjects()
 
     def getStandardButtons(self):
         return int(QtGui.QDialogButtonBox.Close)
 
     def accept(self):
+        self.close()
+        FreeCADGui.Control.closeDialog()
+
+    def reject(self):
+        self.close()
         FreeCADGui.Control.closeDialog()
 
+    def close(self):
+        "cancels all running and pending requests"
+        self.Cancelled = True
+        self.Worker.cancel()
+        self.stopPoller()
+        if hasattr(self,"client"):
+            self.client.close()
+
+    def stopPoller(self):
+        if getattr(self,"Poller",None):
+            self.Poller.requestInterruption()
+            self.Poller.wait()
+            self.Poller = None
+
     def getPrefs(self):
         url = self.prefs.GetString("BimServerUrl","http://localhost:8082")
         if hasattr(self,"token"):
@@ -117,6 +325,50 @@ class BimServerTaskPanel:
             self.form.buttonServer.setToolTip("Click to log in")
             self.Connected = False
 
+    def getClient(self):
+        url,token = self.getPrefs()
+        if not hasattr(self,"client") or (self.client.url != url.rstrip("/")):
+            import BIMServerClient
+            self.client = BIMServerClient.BimServerClient(url,cache=self.getCachePath(),store=self.getStore())
+        self.client.token = token
+        return self.client
+
+    def getCachePath(self):
+        return os.path.join(FreeCAD.getUserAppDataDir(),"WebTools","BimServer")
+
+    def getStore(self):
+        "returns the store of downloaded revisions, its size in MB is set by the BimServerStoreSize preference"
+        import BIMServerClient
+        size = self.prefs.GetInt("BimServerStoreSize",BIMServerClient.DEFAULT_STORESIZE >> 20)
+        try:
+            return BIMServerClient.RevisionStore(os.path.join(self.getCachePath(),"files"),size << 20)
+        except OSError:
+            return None
+
+    def setProgress(self,done,total):
+        "reports the progress of the current transfer from the worker thread, raises Cancelled if the user pressed Cancel"
+        from tools import multipart
+        if self.Cancelled:
+            raise multipart.Cancelled()
+        self.Worker.post(self.showProgress,(done,total))
+
+    def showProgress(self,progress):
+        done,total = progress
+        self.form.progressBar.setMaximum(max(total >> 10,1))
+        self.form.progressBar.setValue(done >> 10)
+        self.form.progressBar.show()
+        self.form.buttonCancel.show()
+
+    def resetProgress(self):
+        self.Cancelled = False
+        self.form.progressBar.setValue(0)
+        self.form.progressBar.hide()
+        self.form.buttonCancel.hide()
+
+    def cancel(self):
+        self.Cancelled = True
+        self.form.labelStatus.setText(translate("WebTools","Cancelling..."))
+
     def login(self):
         self.setLogged(False)
         self.form.labelStatus.setText("")
@@ -133,214 +385,291 @@ class BimServerTaskPanel:
                 login = loginform.editLogin.text()
                 passwd = loginform.editPassword.text()
                 store = loginform.checkStore.isChecked()
-                import requests, json
+                import BIMServerClient
                 self.form.labelStatus.setText("Logging in...")
-                url2 = url + "/json"
-                data = {'request': {'interface': 'AuthInterface', 'method': 'login', 'parameters': {'username': login, 'password': passwd}}}
-                try:
-                    resp = requests.post(url2,data = json.dumps(data))
-                except:
-                    FreeCAD.Console.PrintError(translate("WebTools","Unable to connect to BimServer at")+" "+url+"\n")
-                    self.form.labelStatus.setText(translate("WebTools","Connection failed."))
-                    return
-                if resp.ok:
-                    try:
-                        token = resp.json()["response"]["result"]
-                    except:
-                        return
-                    else:
-                        if store:
-                            self.prefs.SetString("BimServerUrl",url)
-                            if token:
-                                self.prefs.SetString("BimServerToken",token)
-                        else:
-                            self.prefs.SetString("BimServerToken","")
+                self.client = BIMServerClient.BimServerClient(url,cache=self.getCachePath(),store=self.getStore())
+                client = self.client
+                def onLogin(token):
+                    if store:
+                        self.prefs.SetString("BimServerUrl",url)
                         if token:
-                            self.token = token
-                            self.getProjects()
+                            self.prefs.SetString("BimServerToken",token)
+                    else:
+                        self.prefs.SetString("BimServerToken","")
+                    self.form.labelStatus.setText("")
+                    if token:
+                        self.token = token
+                        self.getProjects()
+                def onError(e):
+                    if isinstance(e,BIMServerClient.BimServerError):
+                        FreeCAD.Console.PrintError(translate("WebTools","Unable to log in to BimServer:")+" "+str(e)+"\n")
+                        self.form.labelStatus.setText(translate("WebTools","Login failed."))
+                    else:
+                        FreeCAD.Console.PrintError(translate("WebTools","Unable to connect to BimServer at")+" "+url+"\n")
+                        self.form.labelStatus.setText(translate("WebTools","Connection failed."))
+                self.Worker.run(lambda: client.login(login,passwd),onLogin,onError)
+                return
         self.form.labelStatus.setText("")
 
     def browse(self):
         url = self.prefs.GetString("BimServerUrl","http://localhost:8082")+"/apps/bimviews"
         QtGui.QDesktopServices.openUrl(QtCore.QUrl(url, QtCore.QUrl.TolerantMode))
 
-    def getProjects(self):
-        self.setLogged(False)
-        self.Projects = []
-        self.form.labelStatus.setText("")
-        import requests, json
+    def getProjects(self,refresh=False):
         url,token = self.getPrefs()
         if url and token:
             self.form.labelStatus.setText(translate("WebTools","Getting projects list..."))
-            url += "/json"
-            data = { "token": token, "request": { "interface": "SettingsInterface", "method": "getServerSettings", "parameters": { } } }
-            try:
-                resp = requests.post(url,data = json.dumps(data))
-            except:
-                FreeCAD.Console.PrintError(translate("WebTools","Unable to connect to BimServer at")+" "+url[:-5]+"\n")
-                self.form.labelStatus.setText(translate("WebTools","Connection failed."))
-                return
-            if resp.ok:
+            client = self.getClient()
+            def onSettings(settings):
                 try:
-                    name = resp.json()["response"]["result"]["name"]
-                except:
+                    self.form.labelServerName.setText(settings["name"])
+                except Exception:
                     pass # unable to get the server name
-                else:
-                    self.form.labelServerName.setText(name)
-            data = { "token": token, "request": { "interface": "ServiceInterface", "method": "getAllProjects", "parameters": { "onlyTopLevel": "false", "onlyActive": "true" } } }
-            resp = requests.post(url,data = json.dumps(data))
-            if resp.ok:
-                try:
-                    projects = resp.json()["response"]["result"]
-                except:
-                    FreeCAD.Console.PrintError(translate("WebTools","Unable to get projects list from BimServer\n"))
-                else:
-                    self.setLogged(True)
-                    self.form.comboProjects.clear()
-                    for p in projects:
-                        self.form.comboProjects.addItem(p["name"])
-                    self.Projects = projects
-                    self.form.comboProjects.setCurrentIndex(0)
-                    self.getRevisions(0)
+            def onError(e):
+                self.setLogged(False)
+                FreeCAD.Console.PrintError(translate("WebTools","Unable to get projects list from BimServer\n"))
+                self.form.labelStatus.setText(translate("WebTools","Connection failed."))
+            self.Worker.run(client.getServerSettings,onSettings)
+            self.Worker.run(lambda: client.getAllProjects(refresh=refresh),self.onProjects,onError)
+
+    def onProjects(self,projects):
+        self.setLogged(True)
         self.form.labelStatus.setText("")
+        self.setProjects(projects)
+
+    def setProjects(self,projects):
+        "fills the projects list, keeping the current project if possible"
+        if projects == self.Projects:
+            return
+        index = max(self.form.comboProjects.currentIndex(),0)
+        self.Projects = projects
+        self.form.comboProjects.blockSignals(True)
+        self.form.comboProjects.clear()
+        for p in projects:
+            self.form.comboProjects.addItem(p["name"])
+        if index >= len(projects):
+            index = 0
+        self.form.comboProjects.setCurrentIndex(index)
+        self.form.comboProjects.blockSignals(False)
+        self.getRevisions(index)
 
     def getRevisions(self,index):
         self.form.labelStatus.setText("")
         self.form.listRevisions.clear()
         self.Revisions = []
-        import requests, json
+        # the user might switch to another project before we are done with this one
+        self.RevisionsRequest += 1
+        request = self.RevisionsRequest
         url,token = self.getPrefs()
         if url and token:
-            url += "/json"
             if (index >= 0) and (len(self.Projects) > index):
                 p = self.Projects[index]
                 self.form.labelStatus.setText(translate("WebTools","Getting revisions..."))
-                for rev in p["revisions"]:
-                    data = { "token": token, "request": { "interface": "ServiceInterface", "method": "getRevision", "parameters": { "roid": rev } } }
-                    resp = requests.post(url,data = json.dumps(data))
-                    if resp.ok:
-                        try:
-                            name = resp.json()["response"]["result"]["comment"]
-                            date = resp.json()["response"]["result"]["date"]
-                        except:
-                            pass # unable to get the revision
-                        else:
-                            date = time.strftime("%a %d %b %Y %H:%M:%S GMT", time.gmtime(int(date)/1000.0))
-                            self.form.listRevisions.addItem(date+" - "+name)
-                            self.Revisions.append(resp.json()["response"]["result"])
-        self.form.labelStatus.setText("")
+                client = self.getClient()
+                def fetch():
+                    for rev,result in client.getRevisions(p["revisions"],p.get("oid")):
+                        if request != self.RevisionsRequest:
+                            return
+                        if result:
+                            self.Worker.post(self.addRevision,(request,result))
+                    return request
+                self.Worker.run(fetch,self.onRevisionsDone,lambda e: self.onRevisionsDone(request))
+
+    def addRevision(self,revision):
+        request,result = revision
+        if request != self.RevisionsRequest:
+            return
+        try:
+            name = result["comment"]
+            date = result["date"]
+        except Exception:
+            pass # unable to get the revision
+        else:
+            date = time.strftime("%a %d %b %Y %H:%M:%S GMT", time.gmtime(int(date)/1000.0))
+            self.form.listRevisions.addItem(date+" - "+name)
+            self.Revisions.append(result)
+
+    def onRevisionsDone(self,request):
+        if request == self.RevisionsRequest:
+            self.form.labelStatus.setText("")
 
     def openFile(self):
         self.form.labelStatus.setText("")
         if (self.form.listRevisions.currentRow() >= 0) and (len(self.Revisions) > self.form.listRevisions.currentRow()):
             rev = self.Revisions[self.form.listRevisions.currentRow()]
-            import requests, json
             url,token = self.getPrefs()
             if url and token:
-                FreeCAD.Console.PrintMessage(translate("WebTools","Downloading file from Bimserver...\n"))
-                self.form.labelStatus.setText(translate("WebTools","Checking available serializers..."))
-                url += "/json"
-                serializer = None
-                for s in ["Ifc2x3tc1"]: # Ifc4 seems unreliable ATM, let's stick with good old Ifc2x3...
-                    data = { "token": token, "request": { "interface": "ServiceInterface", "method": "getSerializerByName", "parameters": { "serializerName": s } } }
-                    resp = requests.post(url,data = json.dumps(data))
-                    if resp.ok:
-                        try:
-                            srl = resp.json()["response"]["result"]
-                        except:
-                            pass # unable to get this serializer
-                        else:
-                            serializer = srl
-                            break
-                if not serializer:
-                    FreeCAD.Console.PrintError(translate("WebTools","Unable to get a valid serializer from the BimServer\n"))
-                    return
                 tf = QtGui.QFileDialog.getSaveFileName(QtGui.QApplication.activeWindow(), "Save the downloaded IFC file?", None, "IFC files (*.ifc)")
                 if tf:
                     tf = tf[0]
+                import BIMServerClient
+                FreeCAD.Console.PrintMessage(translate("WebTools","Downloading file from Bimserver...\n"))
                 self.form.labelStatus.setText(translate("WebTools","Downloading file..."))
-                data = { "token": token, "request": { "interface": "ServiceInterface", "method": "download", "parameters": { "roids": [rev["oid"]], "serializerOid": serializer["oid"], "query": "{\"includeAllFields\": true}", "sync": "false" } } }
-                resp = requests.post(url,data = json.dumps(data))
-                if resp.ok:
-                    try:
-                        downloadid = resp.json()["response"]["result"]
-                    except:
-                        FreeCAD.Console.PrintError(translate("WebTools","Unable to obtain a valid download for this revision from the BimServer\n"))
-                        return
-                data = { "token": token, "request": { "interface": "ServiceInterface", "method": "getDownloadData", "parameters": { "topicId": downloadid } } }
-                resp = requests.post(url,data = json.dumps(data))
-                if resp.ok:
+                client = self.getClient()
+                types = [t.strip() for t in self.form.editTypes.text().split(",") if t.strip()]
+                query = BIMServerClient.makeQuery(types)
+                def download():
+                    serializer = None
+                    for s in ["Ifc2x3tc1"]: # Ifc4 seems unreliable ATM, let's stick with good old Ifc2x3...
+                        try:
+                            serializer = client.findSerializer(s)
+                        except Exception:
+                            pass # unable to get this serializer
+                        if serializer:
+                            break
+                    if not serializer:
+                        raise BIMServerClient.BimServerError(translate("WebTools","Unable to get a valid serializer from the BimServer"))
+                    path = client.downloadRevision(rev["oid"],serializer["oid"],query,self.setProgress)
+                    if tf:
+                        # models can weigh gigabytes, don't copy them on the GUI thread
+                        import shutil
+                        self.Worker.post(self.form.labelStatus.setText,translate("WebTools","Saving file..."))
+                        try:
+                            shutil.copyfile(path,tf)
+                        except Exception:
+                            if not client.store:
+                                os.remove(path)
+                            raise
+                    return path
+                def onDownloaded(path):
+                    self.resetProgress()
+                    FreeCAD.Console.PrintMessage(translate("WebTools","Opening file...\n"))
+                    self.form.labelStatus.setText(translate("WebTools","Opening file..."))
+                    import importIFC
                     try:
-                        downloaddata = resp.json()["response"]["result"]["file"]
-                    except:
-                        FreeCAD.Console.PrintError(translate("WebTools","Unable to download the data for this revision.\n"))
-                        return
+                        importIFC.open(path)
+                    finally:
+                        if not client.store:
+                            # a temporary file, not kept in the store
+                            os.remove(path)
+                    if FreeCAD.ActiveDocument:
+                        # the stored file is named after its contents
+                        FreeCAD.ActiveDocument.Label = self.form.comboProjects.currentText()+" - "+str(rev.get("comment",rev["oid"]))
+                    self.form.labelStatus.setText("")
+                def onError(e):
+                    from tools import multipart
+                    self.resetProgress()
+                    self.form.labelStatus.setText("")
+                    if isinstance(e,multipart.Cancelled):
+                        FreeCAD.Console.PrintWarning(translate("WebTools","File download cancelled\n"))
+                    elif isinstance(e,BIMServerClient.BimServerError):
+                        FreeCAD.Console.PrintError(str(e)+"\n")
                     else:
-                        FreeCAD.Console.PrintMessage(translate("WebTools","Opening file...\n"))
-                        self.form.labelStatus.setText(translate("WebTools","Opening file..."))
-                        if not tf:
-                            tf = tempfile.mktemp(suffix=".ifc")
-                        f = open(tf,"wb")
-                        f.write(base64.b64decode(downloaddata))
-                        f.close()
-                        import importIFC
-                        importIFC.open(tf)
-                        os.remove(tf) # why first ask for a name if we remove it anyway?
-        self.form.labelStatus.setText("")
+                        FreeCAD.Console.PrintError(translate("WebTools","Unable to download the data for this revision.\n"))
+                self.resetProgress()
+                self.Worker.run(download,onDownloaded,onError)
 
     def uploadFile(self):
         self.form.labelStatus.setText("")
         if (self.form.comboProjects.currentIndex() >= 0) and (len(self.Projects) > self.form.comboProjects.currentIndex()) and (self.form.comboRoot.currentIndex() >= 0):
             project = self.Projects[self.form.comboProjects.currentIndex()]
-            import requests, json
             url,token = self.getPrefs()
             if url and token:
-                url += "/json"
-                deserializer = None
-                FreeCAD.Console.PrintMessage(translate("WebTools","Saving file...\n"))
+                client = self.getClient()
                 self.form.labelStatus.setText(translate("WebTools","Checking available deserializers..."))
                 import ifcopenshell
                 schema = ifcopenshell.file().schema.lower()
-                data = { "token": token, "request": { "interface": "PluginInterface",  "method": "getAllDeserializers", "parameters": { "onlyEnabled": "true" } } }
-                resp = requests.post(url,data = json.dumps(data))
-                if resp.ok:
-                    try:
-                        for d in resp.json()["response"]["result"]:
-                            if schema in d["name"].lower():
-                                deserializer = d
-                                break
-                    except:
-                        pass
-                if not deserializer:
+                def onError(e):
                     FreeCAD.Console.PrintError(translate("WebTools","Unable to get a valid deserializer for the schema")+" "+schema+"\n")
-                    return
-                tf = QtGui.QFileDialog.getSaveFileName(QtGui.QApplication.activeWindow(), translate("WebTools","Save the IFC file before uploading?"), None, translate("WebTools","IFC files (*.ifc)"))
-                comment = self.form.editComment.text()
-                if tf and tf[0]:
-                    tf = tf[0]
-                    if not comment:
-                        comment = os.path.basename(tf)
-                else:
-                    tf = tempfile.mktemp(suffix=".ifc")
-                import exportIFC
-                self.form.labelStatus.setText(translate("WebTools","Saving file..."))
-                exportIFC.export([self.RootObjects[self.form.comboRoot.currentIndex()]],tf)
-                f = open(tf,"rb")
-                ifcdata = base64.b64encode(f.read()).decode("ascii")
-                f.close()
-                FreeCAD.Console.PrintMessage(translate("WebTools","Uploading file to Bimserver...\n"))
-                self.form.labelStatus.setText(translate("WebTools","Uploading file..."))
-                data = { "token": token, "request": { "interface": "ServiceInterface", "method": "checkinSync", "parameters": { "poid": project["oid"], "comment": comment, "deserializerOid": deserializer["oid"], "fileSize": os.path.getsize(tf), "fileName": os.path.basename(tf), "data": ifcdata, "merge": "false" } } }
-                resp = requests.post(url,data = json.dumps(data))
-                if resp.ok:
-                    if "result" in resp.json()["response"]:
-                        FreeCAD.Console.PrintMessage(translate("WebTools","File upload successful\n"))
-                        self.getRevisions(self.form.comboProjects.currentIndex())
-                    elif "exception" in resp.json()["response"]:
-                        FreeCAD.Console.PrintError(translate("WebTools","File upload failed, caused by: ")+resp.json()["response"]["exception"]["message"]+"\n")
-                    else:
-                        FreeCAD.Console.PrintError(translate("WebTools","File upload failed\n"))
+                    self.form.labelStatus.setText("")
+                self.form.buttonUpload.setEnabled(False)
+                self.Worker.run(lambda: client.findDeserializer(schema),lambda d: self.exportFile(project,schema,d),onError)
+
+    def exportFile(self,project,schema,deserializer):
+        "exports the selected root object and uploads it to the given project"
+        self.form.buttonUpload.setEnabled(True)
+        if not deserializer:
+            FreeCAD.Console.PrintError(translate("WebTools","Unable to get a valid deserializer for the schema")+" "+schema+"\n")
+            self.form.labelStatus.setText("")
+            return
+        client = self.getClient()
+        tracker = ExportTracker(client.cache,project["oid"],self.RootObjects[self.form.comboRoot.currentIndex()])
+        objects,merge = tracker.getExportList(full=self.form.checkFull.isChecked())
+        if not objects:
+            FreeCAD.Console.PrintMessage(translate("WebTools","Nothing changed since the last upload. Check \"Full upload\" to upload everything again\n"))
+            self.form.labelStatus.setText("")
+            return
+        tf = QtGui.QFileDialog.getSaveFileName(QtGui.QApplication.activeWindow(), translate("WebTools","Save the IFC file before uploading?"), None, translate("WebTools","IFC files (*.ifc)"))
+        comment = self.form.editComment.text()
+        if tf and tf[0]:
+            tf = tf[0]
+            if not comment:
+                comment = os.path.basename(tf)
+        else:
+            tf = tempfile.mktemp(suffix=".ifc")
+        import exportIFC
+        FreeCAD.Console.PrintMessage(translate("WebTools","Saving file...\n"))
+        if merge:
+            FreeCAD.Console.PrintMessage(translate("WebTools","Exporting %i changed storeys\n") % len(objects))
+        self.form.labelStatus.setText(translate("WebTools","Saving file..."))
+        exportIFC.export(objects,tf)
+        if not tracker.setParents(tf,merge):
+            # the spatial structure can't be matched, upload everything
+            objects,merge = [tracker.root],False
+            exportIFC.export(objects,tf)
+            tracker.setParents(tf,merge)
+        # the exporter stores the IFC ids of the objects
+        tracker.update()
+        FreeCAD.Console.PrintMessage(translate("WebTools","Uploading file to Bimserver...\n"))
+        self.form.labelStatus.setText(translate("WebTools","Uploading file..."))
+        import BIMServerClient
+        def onUploaded(result):
+            self.Tracker = tracker
+            if result.get("topicId"):
+                # the server now processes the file in the background
+                self.stopPoller()
+                self.form.buttonCancel.hide()
+                self.Poller = ProgressPoller(client,result["topicId"])
+                self.Poller.progress.connect(self.onCheckinProgress)
+                self.Poller.done.connect(self.onCheckinDone)
+                self.Poller.start()
+                self.form.labelStatus.setText(translate("WebTools","Processing file..."))
+            else:
+                self.onCheckinDone(True,"")
+        def onError(e):
+            from tools import multipart
+            self.resetProgress()
+            self.form.buttonUpload.setEnabled(True)
+            self.form.labelStatus.setText("")
+            if isinstance(e,multipart.Cancelled):
+                FreeCAD.Console.PrintWarning(translate("WebTools","File upload cancelled\n"))
+            elif isinstance(e,BIMServerClient.BimServerError):
+                FreeCAD.Console.PrintError(translate("WebTools","File upload failed, caused by: ")+str(e)+"\n")
+            else:
+                FreeCAD.Console.PrintError(translate("WebTools","File upload failed\n"))
+        self.resetProgress()
+        self.form.buttonUpload.setEnabled(False)
+        self.Worker.run(lambda: client.uploadFile(project["oid"],comment,deserializer["oid"],tf,merge=merge,sync=False,progress=self.setProgress),onUploaded,onError)
+
+    def onCheckinProgress(self,percent,title):
+        self.form.labelStatus.setText(title or translate("WebTools","Processing file..."))
+        if percent >= 0:
+            self.form.progressBar.setMaximum(100)
+            self.form.progressBar.setValue(percent)
+        else:
+            # busy indicator
+            self.form.progressBar.setMaximum(0)
+        self.form.progressBar.show()
+
+    def onCheckinDone(self,success,message):
+        # done is emitted from run(), wait for the thread to end before dropping it
+        self.stopPoller()
+        tracker = getattr(self,"Tracker",None)
+        self.Tracker = None
+        self.resetProgress()
+        self.form.buttonUpload.setEnabled(True)
         self.form.labelStatus.setText("")
+        if success:
+            FreeCAD.Console.PrintMessage(translate("WebTools","File upload successful\n"))
+            if tracker:
+                tracker.save()
+            self.form.checkFull.setChecked(False)
+            # get the new revision ids of the project
+            self.getProjects(refresh=True)
+        elif message:
+            FreeCAD.Console.PrintError(translate("WebTools","File upload failed, caused by: ")+message+"\n")
+        else:
+            FreeCAD.Console.PrintError(translate("WebTools","File upload failed\n"))
 
 
 if FreeCAD.GuiUp:
@@ -0,0 +1,816 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2026 Yorik van Havre <yorik@uncreated.net>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+"""Generic BimServer interface (doesn't depend on FreeCAD)
+
+This module talks to the JSON API of a BimServer instance. It is used by
+the BimServer task panel, but can also be used from scripts and batch jobs
+running without the FreeCAD GUI:
+
+    import BIMServerClient
+    client = BIMServerClient.BimServerClient("http://localhost:8082")
+    client.login("admin@bimserver.org", "admin")
+    for p in client.getAllProjects():
+        print(p["name"])
+"""
+
+import os, json, time, base64, hashlib, tempfile, shutil
+from concurrent.futures import ThreadPoolExecutor
+
+__title__ = "BimServer JSON API client"
+__author__ = "Yorik van Havre"
+__url__ = "http://www.freecadweb.org"
+
+
+DEFAULT_TIMEOUT = (10, 300) # connect, read (seconds)
+CHECKIN_TIMEOUT = (10, None) # check-ins answer once the revision is stored, which can take minutes
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5 # seconds, doubled at each retry
+DEFAULT_POOLSIZE = 8
+DEFAULT_TTL = 300 # seconds before the cached projects list is refreshed
+CHUNKSIZE = 1048576 # bytes read or written at once when streaming files
+DEFAULT_STORESIZE = 2147483648 # bytes of downloaded files kept in a RevisionStore
+QUERY_ALL = json.dumps({"includeAllFields": True})
+
+# the objects an IFC serializer needs to write valid entities
+QUERY_INCLUDES = ["validifc:ContainedInStructure",
+                  "validifc:OwnerHistory",
+                  "validifc:Representation",
+                  "validifc:ObjectPlacement"]
+
+
+class BimServerError(Exception):
+
+    """Raised when the BimServer answers a request with an exception
+    or with something that is not a valid JSON API response"""
+
+
+def makeRetry(retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, status=True):
+
+    """Returns a urllib3 Retry object for the /json endpoint. Connection
+    errors are retried with an exponential backoff, and so are gateway
+    errors if status is True. Read errors are not, since the server may
+    already have processed the request. Gateway errors must not be
+    retried for calls that change the server, like check-ins: the server
+    behind the gateway may have processed them too"""
+
+    try:
+        from urllib3.util.retry import Retry
+    except ImportError:
+        from requests.packages.urllib3.util.retry import Retry
+    kwargs = {"total": retries,
+              "connect": retries,
+              "read": 0,
+              "status": retries if status else 0,
+              "backoff_factor": backoff,
+              "status_forcelist": (502, 503, 504) if status else (),
+              "respect_retry_after_header": status,
+              "raise_on_status": False}
+    try:
+        # all BimServer JSON calls are POST requests
+        return Retry(allowed_methods=None, **kwargs)
+    except TypeError:
+        # urllib3 < 1.26
+        return Retry(method_whitelist=False, **kwargs)
+
+
+def decodeToFile(data, f, chunksize=CHUNKSIZE):
+
+    """Decodes a base64 string into the given open file, chunksize bytes
+    at a time, without building the whole decoded data in memory"""
+
+    step = (chunksize // 3) * 4
+    for i in range(0, len(data), step):
+        f.write(base64.b64decode(data[i:i+step]))
+
+
+class Base64JSONStream:
+
+    """A read-only file-like object that produces the given JSON data, in
+    which the placeholder string is replaced by the base64 encoding of a
+    file. The file is read and encoded only as the body is consumed, so
+    memory use doesn't depend on its size. The total length is known in
+    advance, so requests sends it with a Content-Length header"""
+
+    def __init__(self, data, path, placeholder, chunksize=CHUNKSIZE):
+
+        text = json.dumps(data).encode("utf-8")
+        head, tail = text.split(json.dumps(placeholder).encode("utf-8"))
+        self.buffer = head + b"\""
+        self.offset = 0 # position in the buffer
+        self.tail = b"\"" + tail
+        self.step = max(chunksize // 4, 1) * 3 # whole base64 quanta
+        self.length = len(self.buffer) + 4 * ((os.path.getsize(path) + 2) // 3) + len(self.tail)
+        self.file = open(path, "rb")
+
+    def __len__(self):
+
+        return self.length
+
+    def close(self):
+
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def read(self, size=-1):
+
+        """Returns up to size bytes of the body, b"" when it is over"""
+
+        if (size is None) or (size < 0):
+            size = self.length
+        if (len(self.buffer) - self.offset < size) and (self.file or self.tail):
+            data = [self.buffer[self.offset:]]
+            available = len(data[0])
+            while (available < size) and (self.file or self.tail):
+                chunk = self.file.read(self.step) if self.file else b""
+                if chunk:
+                    chunk = base64.b64encode(chunk)
+                else:
+                    self.close()
+                    chunk, self.tail = self.tail, b""
+                data.append(chunk)
+                available += len(chunk)
+            self.buffer = b"".join(data)
+            self.offset = 0
+        data = self.buffer[self.offset:self.offset + size]
+        self.offset += len(data)
+        return data
+
+
+def makeQuery(types=None):
+
+    """Returns a BimServer JSON query downloading only the entities of the
+    given IFC types (for ex. ["IfcWall", "IfcBuildingStorey"]) and their
+    subtypes, together with what is needed to serialize them, or everything
+    if no type is given"""
+
+    if not types:
+        return QUERY_ALL
+    query = {"types": [{"name": t, "includeAllSubTypes": True} for t in types],
+             "includes": QUERY_INCLUDES,
+             "includeAllFields": True}
+    return json.dumps(query)
+
+
+class BimServerCache:
+
+    """A persistent cache of BimServer data, stored as JSON files in a
+    subfolder of path named after the server url. Revisions are immutable
+    once checked in, so they are kept forever, keyed by their oid. The
+    projects list (which contains the revision ids of each project) is
+    refreshed when it is older than ttl seconds"""
+
+    def __init__(self, path, url, ttl=DEFAULT_TTL):
+
+        key = hashlib.sha1(url.rstrip("/").encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(path, key)
+        self.ttl = ttl
+
+    def read(self, name, ttl=None):
+
+        """Returns the cached data stored under the given name, or None
+        if there is none or if it is older than ttl seconds"""
+
+        path = os.path.join(self.path, name)
+        try:
+            if (ttl is not None) and (time.time() - os.path.getmtime(path) > ttl):
+                return None
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, name, data):
+
+        """Stores data under the given name. The file is written
+        atomically, so concurrent readers never see a partial file"""
+
+        path = os.path.join(self.path, name)
+        folder = os.path.dirname(path)
+        try:
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass # the cache is an optimization, never fail because of it
+
+    def remove(self, name):
+
+        try:
+            os.remove(os.path.join(self.path, name))
+        except OSError:
+            pass
+
+    def getRevision(self, roid):
+
+        return self.read(os.path.join("revisions", str(roid)+".json"))
+
+    def setRevision(self, revision):
+
+        self.write(os.path.join("revisions", str(revision["oid"])+".json"), revision)
+
+    def getProjects(self, key, fresh=True):
+
+        """Returns the cached projects list, or None if there is none or,
+        if fresh is True, if it is older than the ttl"""
+
+        return self.read("projects-"+key+".json", self.ttl if fresh else None)
+
+    def setProjects(self, key, projects):
+
+        self.write("projects-"+key+".json", projects)
+
+    def invalidateProjects(self):
+
+        """Forgets all the cached projects lists, for ex. after logging in
+        as another user or after checking in a new revision"""
+
+        if os.path.isdir(self.path):
+            for f in os.listdir(self.path):
+                if f.startswith("projects-"):
+                    self.remove(f)
+
+
+class RevisionStore:
+
+    """A content-addressed store of downloaded revision files. Files are
+    stored once under the hash of their contents, and small reference files
+    map a server url, revision oid, serializer and query to them. When the
+    store grows above maxsize bytes, the least recently used files are
+    removed"""
+
+    def __init__(self, path, maxsize=DEFAULT_STORESIZE):
+
+        self.path = path
+        self.maxsize = maxsize
+        for folder in ("objects", "refs"):
+            if not os.path.isdir(os.path.join(path, folder)):
+                os.makedirs(os.path.join(path, folder))
+
+    def getRef(self, url, roid, serializerOid, query):
+
+        key = "|".join([url.rstrip("/"), str(roid), str(serializerOid), query])
+        return os.path.join(self.path, "refs", hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def get(self, url, roid, serializerOid, query=QUERY_ALL):
+
+        """Returns the path of the stored file, or None"""
+
+        try:
+            with open(self.getRef(url, roid, serializerOid, query), "r") as f:
+                path = os.path.join(self.path, "objects", f.read().strip())
+            # mark it as recently used
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def tempFile(self, suffix=".ifc"):
+
+        """Returns the path of a new temporary file in the store, on the
+        same disk as the stored files so it can be moved there quickly"""
+
+        fd, path = tempfile.mkstemp(dir=self.path, suffix=suffix)
+        os.close(fd)
+        return path
+
+    def add(self, url, roid, serializerOid, query, filepath):
+
+        """Moves the given file into the store and returns its new path"""
+
+        h = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNKSIZE), b""):
+                h.update(chunk)
+        name = h.hexdigest() + os.path.splitext(filepath)[1]
+        path = os.path.join(self.path, "objects", name)
+        if os.path.exists(path):
+            os.remove(filepath)
+            os.utime(path, None)
+        else:
+            shutil.move(filepath, path)
+        with open(self.getRef(url, roid, serializerOid, query), "w") as f:
+            f.write(name)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+
+        """Removes the least recently used files until the store is smaller
+        than maxsize, and the references to removed files"""
+
+        folder = os.path.join(self.path, "objects")
+        files = [os.path.join(folder, f) for f in os.listdir(folder)]
+        files = sorted([(os.path.getmtime(f), os.path.getsize(f), f) for f in files])
+        size = sum([f[1] for f in files])
+        removed = False
+        for mtime, fsize, f in files:
+            if size <= self.maxsize:
+                break
+            if f != keep:
+                os.remove(f)
+                size -= fsize
+                removed = True
+        if removed:
+            folder = os.path.join(self.path, "refs")
+            for ref in os.listdir(folder):
+                try:
+                    with open(os.path.join(folder, ref), "r") as f:
+                        name = f.read().strip()
+                    if not os.path.exists(os.path.join(self.path, "objects", name)):
+                        os.remove(os.path.join(folder, ref))
+                except OSError:
+                    pass
+
+
+class BimServerClient:
+
+    """A client for the JSON API of a BimServer instance. Calls go through
+    pooled, keep-alive requests sessions, so the TCP/TLS connection to the
+    server is reused between calls: one for the read-only calls, one
+    without retries on gateway errors for the others. If a cache folder
+    is given, projects and revisions are cached there (see BimServerCache).
+    If a RevisionStore is given, downloaded revisions are kept there"""
+
+    def __init__(self, url, token=None, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, poolsize=DEFAULT_POOLSIZE, cache=None, store=None, checkinTimeout=CHECKIN_TIMEOUT):
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.checkinTimeout = checkinTimeout
+        self.plugins = None
+        self.store = store
+        self.cache = None
+        if cache:
+            self.cache = BimServerCache(cache, self.url)
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        # plain pooled adapter for everything, retrying one for the /json endpoint
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=poolsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        jsonadapter = HTTPAdapter(pool_connections=1, pool_maxsize=poolsize, max_retries=makeRetry(retries, backoff))
+        self.session.mount(self.url+"/json", jsonadapter)
+        # the calls that change the server only retry connection errors
+        self.writeSession = requests.Session()
+        self.writeSession.headers.update({"Content-Type": "application/json"})
+        writeadapter = HTTPAdapter(pool_connections=1, pool_maxsize=poolsize, max_retries=makeRetry(retries, backoff, status=False))
+        self.writeSession.mount("http://", writeadapter)
+        self.writeSession.mount("https://", writeadapter)
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    def close(self):
+
+        """Closes all the pooled connections to the server"""
+
+        self.session.close()
+        self.writeSession.close()
+
+    def call(self, interface, method, **parameters):
+
+        """Performs a JSON API call and returns its result. Raises a
+        BimServerError if the server answers with an exception, and a
+        requests.exceptions.RequestException if it can't be reached"""
+
+        return self.send(method, json.dumps(self.makeRequest(interface, method, parameters)))
+
+    def makeRequest(self, interface, method, parameters):
+
+        """Returns the JSON data of a call"""
+
+        data = {"request": {"interface": interface, "method": method, "parameters": parameters}}
+        if self.token:
+            data["token"] = self.token
+        return data
+
+    def send(self, method, body, timeout=None):
+
+        """Posts the JSON data of a call, given as a string or a file-like
+        object, and returns its result. Only the read-only get* calls are
+        retried on gateway errors. The timeout of the client is used if
+        none is given"""
+
+        session = self.session if method.startswith("get") else self.writeSession
+        resp = session.post(self.url+"/json", data=body, timeout=timeout or self.timeout)
+        try:
+            response = resp.json()["response"]
+        except (ValueError, KeyError, TypeError):
+            resp.raise_for_status()
+            raise BimServerError("Invalid response from BimServer at "+self.url)
+        if "exception" in response:
+            raise BimServerError(response["exception"].get("message", "Unknown error"))
+        if not resp.ok:
+            resp.raise_for_status()
+        return response.get("result")
+
+    # AuthInterface
+
+    def login(self, username, password):
+
+        """Logs in and stores the returned token for the next calls"""
+
+        self.token = None
+        self.plugins = None
+        self.token = self.call("AuthInterface", "login", username=username, password=password)
+        if self.cache:
+            # another user might see other projects
+            self.cache.invalidateProjects()
+        return self.token
+
+    def logout(self):
+
+        if self.token:
+            try:
+                self.call("AuthInterface", "logout")
+            finally:
+                self.token = None
+
+    # SettingsInterface
+
+    def getServerSettings(self):
+
+        return self.call("SettingsInterface", "getServerSettings")
+
+    # ServiceInterface
+
+    def getCachedProjects(self, onlyTopLevel=False, onlyActive=True):
+
+        """Returns the last known projects list, whatever its age, without
+        accessing the server, or None if there is none"""
+
+        if self.cache:
+            key = "%s-%s" % (str(onlyTopLevel).lower(), str(onlyActive).lower())
+            return self.cache.getProjects(key, fresh=False)
+        return None
+
+    def getAllProjects(self, onlyTopLevel=False, onlyActive=True, refresh=False):
+
+        """Returns the list of projects. If a cache is used, a cached
+        list younger than the cache ttl is returned, unless refresh is True"""
+
+        key = "%s-%s" % (str(onlyTopLevel).lower(), str(onlyActive).lower())
+        if self.cache and not refresh:
+            projects = self.cache.getProjects(key)
+            if projects is not None:
+                return projects
+        projects = self.call("ServiceInterface", "getAllProjects",
+                             onlyTopLevel=str(onlyTopLevel).lower(),
+                             onlyActive=str(onlyActive).lower())
+        if self.cache and (projects is not None):
+            self.cache.setProjects(key, projects)
+        return projects
+
+    def getRevision(self, roid):
+
+        return self.call("ServiceInterface", "getRevision", roid=roid)
+
+    def getAllRevisionsOfProject(self, poid):
+
+        return self.call("ServiceInterface", "getAllRevisionsOfProject", poid=poid)
+
+    def getRevisions(self, roids, poid=None, workers=DEFAULT_POOLSIZE):
+
+        """Yields (roid, revision) tuples in the order of roids, as soon as
+        each revision is available. Cached revisions are returned directly,
+        the others are fetched with fetchRevisions() and added to the cache.
+        All the revisions of the project are only requested at once if
+        most of them are missing, otherwise just the missing ones are.
+        revision is None if it couldn't be retrieved"""
+
+        cached = {}
+        if self.cache:
+            for roid in roids:
+                revision = self.cache.getRevision(roid)
+                if revision:
+                    cached[roid] = revision
+        missing = [roid for roid in roids if roid not in cached]
+        if len(missing) <= max(workers, len(roids) // 2):
+            # one round of small calls is cheaper than all the revisions
+            poid = None
+        fetched = self.fetchRevisions(missing, poid, workers)
+        try:
+            for roid in roids:
+                if roid in cached:
+                    yield roid, cached[roid]
+                else:
+                    roid, revision = next(fetched)
+                    if revision and self.cache:
+                        self.cache.setRevision(revision)
+                    yield roid, revision
+        finally:
+            fetched.close()
+
+    def fetchRevisions(self, roids, poid=None, workers=DEFAULT_POOLSIZE):
+
+        """Yields (roid, revision) tuples in the order of roids, as soon as
+        each revision is downloaded. If the project oid is given, all the
+        revisions are first requested in one getAllRevisionsOfProject call.
+        Otherwise, or if that fails, they are fetched concurrently by a
+        bounded pool of workers. revision is None if it couldn't be fetched"""
+
+        if not roids:
+            return
+        if poid is not None:
+            try:
+                revisions = dict([(r["oid"], r) for r in self.getAllRevisionsOfProject(poid)])
+            except Exception:
+                revisions = None
+            if revisions:
+                for roid in roids:
+                    yield roid, revisions.get(roid)
+                return
+
+        def fetch(roid):
+            try:
+                return self.getRevision(roid)
+            except Exception:
+                return None
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(roids))))
+        try:
+            for roid, revision in zip(roids, pool.map(fetch, roids)):
+                yield roid, revision
+        finally:
+            # don't wait for pending requests if the caller stopped early
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def getSerializerByName(self, serializerName):
+
+        return self.call("ServiceInterface", "getSerializerByName", serializerName=serializerName)
+
+    def download(self, roids, serializerOid, query=QUERY_ALL, sync=False):
+
+        """Prepares a download and returns its topic id"""
+
+        return self.call("ServiceInterface", "download", roids=roids, serializerOid=serializerOid, query=query, sync=str(sync).lower())
+
+    def getDownloadData(self, topicId):
+
+        return self.call("ServiceInterface", "getDownloadData", topicId=topicId)
+
+    def cleanupLongAction(self, topicId):
+
+        return self.call("ServiceInterface", "cleanupLongAction", topicId=topicId)
+
+    def downloadToFile(self, topicId, filepath, progress=None, chunksize=CHUNKSIZE):
+
+        """Saves the data of a prepared download to the given file. The
+        data is streamed from the download servlet of the server and written
+        to disk chunksize bytes at a time, so memory use doesn't depend on
+        the model size. If the servlet is not available, it falls back to
+        getDownloadData, which returns the whole file base64-encoded. If
+        given, progress(done, total) is called after each chunk, total
+        being 0 if the server doesn't tell the size of the download"""
+
+        import requests
+        try:
+            try:
+                self.streamDownload(topicId, filepath, progress, chunksize)
+            except (requests.exceptions.RequestException, BimServerError):
+                data = self.getDownloadData(topicId)["file"]
+                with open(filepath, "wb") as f:
+                    decodeToFile(data, f, chunksize)
+                if progress:
+                    progress(os.path.getsize(filepath), os.path.getsize(filepath))
+        finally:
+            try:
+                self.cleanupLongAction(topicId)
+            except Exception:
+                pass
+
+    def downloadRevision(self, roid, serializerOid, query=QUERY_ALL, progress=None):
+
+        """Downloads a revision with the given serializer and query (see
+        makeQuery) and returns the path of the downloaded file. If a store is
+        used, the file is kept there, and revisions already in the store are
+        returned without accessing the server"""
+
+        if self.store:
+            path = self.store.get(self.url, roid, serializerOid, query)
+            if path:
+                return path
+            filepath = self.store.tempFile()
+        else:
+            fd, filepath = tempfile.mkstemp(suffix=".ifc")
+            os.close(fd)
+        try:
+            topicId = self.download([roid], serializerOid, query)
+            self.downloadToFile(topicId, filepath, progress)
+        except BaseException:
+            os.remove(filepath)
+            raise
+        if self.store:
+            return self.store.add(self.url, roid, serializerOid, query, filepath)
+        return filepath
+
+    def streamDownload(self, topicId, filepath, progress=None, chunksize=CHUNKSIZE):
+
+        """Streams a prepared download from the download servlet to the
+        given file"""
+
+        params = {"token": self.token, "topicId": topicId, "zip": "off"}
+        resp = self.session.get(self.url+"/download", params=params, stream=True, timeout=self.timeout)
+        with resp:
+            resp.raise_for_status()
+            if "application/json" in resp.headers.get("Content-Type", ""):
+                # the servlet answered with an error message
+                raise BimServerError(resp.text)
+            total = int(resp.headers.get("Content-Length", 0))
+            done = 0
+            with open(filepath, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=chunksize):
+                    f.write(chunk)
+                    done += len(chunk)
+                    if progress:
+                        progress(done, total)
+
+    def checkinSync(self, poid, comment, deserializerOid, filepath, merge=False):
+
+        """Uploads the given IFC file to the given project, and waits
+        until the server has stored it"""
+
+        return self.checkinBase64("checkinSync", poid, comment, deserializerOid, filepath, merge)
+
+    def checkin(self, poid, comment, deserializerOid, filepath, merge=False):
+
+        """Uploads the given IFC file to the given project, and returns a
+        topic id right away. Use getProgress to follow the check-in"""
+
+        return self.checkinBase64("checkin", poid, comment, deserializerOid, filepath, merge, sync="false")
+
+    def checkinBase64(self, method, poid, comment, deserializerOid, filepath, merge=False, **parameters):
+
+        """Checks in the given IFC file embedded base64-encoded in a JSON
+        call, for servers without an upload servlet. The file is encoded
+        while it is sent, it is never loaded in memory"""
+
+        import uuid
+        placeholder = uuid.uuid4().hex
+        parameters.update({"poid": poid,
+                           "comment": comment,
+                           "deserializerOid": deserializerOid,
+                           "fileSize": os.path.getsize(filepath),
+                           "fileName": os.path.basename(filepath),
+                           "data": placeholder,
+                           "merge": str(merge).lower()})
+        body = Base64JSONStream(self.makeRequest("ServiceInterface", method, parameters), filepath, placeholder)
+        try:
+            result = self.send(method, body, self.checkinTimeout)
+        finally:
+            body.close()
+        if self.cache:
+            # the project now has a new revision
+            self.cache.invalidateProjects()
+        return result
+
+    def uploadFile(self, poid, comment, deserializerOid, filepath, merge=False, sync=True, progress=None, chunksize=CHUNKSIZE):
+
+        """Uploads the given IFC file to the given project. The file is
+        streamed from disk to the upload servlet of the server as a
+        multipart body, so memory use doesn't depend on the model size.
+        If sync is False, it returns as soon as the file is uploaded,
+        without waiting for the server to process it. If given,
+        progress(done, total) is called every chunksize bytes, and may
+        raise tools.multipart.Cancelled to stop the upload. If the servlet
+        is not available, it falls back to checkinSync or checkin. Returns
+        the JSON answer of the servlet, which contains the topic id of the
+        check-in"""
+
+        from tools import multipart
+        fields = [("token", self.token),
+                  ("deserializerOid", deserializerOid),
+                  ("poid", poid),
+                  ("comment", comment),
+                  ("merge", str(merge).lower()),
+                  ("sync", str(sync).lower())]
+        stream = multipart.MultipartStream(fields, [("file", os.path.basename(filepath), filepath)], progress, chunksize)
+        try:
+            resp = self.session.post(self.url+"/upload", data=stream, headers={"Content-Type": stream.contentType}, timeout=self.checkinTimeout)
+        finally:
+            stream.close()
+        if resp.status_code in (404, 405):
+            # no upload servlet on this server
+            if sync:
+                result = {"result": self.checkinSync(poid, comment, deserializerOid, filepath, merge)}
+            else:
+                result = {"topicId": self.checkin(poid, comment, deserializerOid, filepath, merge)}
+            if progress:
+                progress(len(stream), len(stream))
+            return result
+        try:
+            result = resp.json()
+        except ValueError:
+            resp.raise_for_status()
+            raise BimServerError("Invalid response from BimServer at "+self.url)
+        if "exception" in result:
+            raise BimServerError(result["exception"].get("message", "Unknown error"))
+        resp.raise_for_status()
+        if self.cache:
+            self.cache.invalidateProjects()
+        return result
+
+    # NotificationRegistryInterface
+
+    def getProgress(self, topicId):
+
+        """Returns the state of a long action: a dict with a state (NONE,
+        STARTED, FINISHED or AS_ERROR), a progress percentage (-1 if
+        unknown), a title and a list of errors"""
+
+        return self.call("NotificationRegistryInterface", "getProgress", topicId=topicId)
+
+    # PluginInterface
+
+    def getAllSerializers(self, onlyEnabled=True):
+
+        return self.call("PluginInterface", "getAllSerializers", onlyEnabled=str(onlyEnabled).lower())
+
+    def getAllDeserializers(self, onlyEnabled=True):
+
+        return self.call("PluginInterface", "getAllDeserializers", onlyEnabled=str(onlyEnabled).lower())
+
+    def getPlugins(self):
+
+        """Returns the enabled serializers and deserializers of the server,
+        as a dict with a "serializers" and a "deserializers" dict, both
+        indexed by lowercase name. They don't change during the lifetime of
+        a session, so they are fetched only once per token, and kept in the
+        cache together with a hash of the token"""
+
+        key = hashlib.sha1(str(self.token).encode("utf-8")).hexdigest()
+        if self.plugins and (self.plugins["token"] == key):
+            return self.plugins
+        self.plugins = None
+        if self.cache:
+            plugins = self.cache.read("plugins.json")
+            if plugins and (plugins.get("token") == key):
+                self.plugins = plugins
+                return self.plugins
+        plugins = {"token": key}
+        for name, method in (("serializers", self.getAllSerializers), ("deserializers", self.getAllDeserializers)):
+            plugins[name] = dict([(p["name"].lower(), p) for p in method() or []])
+        self.plugins = plugins
+        if self.cache:
+            self.cache.write("plugins.json", plugins)
+        return self.plugins
+
+    def findPlugin(self, kind, name):
+
+        """Returns the first plugin of the given kind ("serializers" or
+        "deserializers") whose name is or contains the given name or schema,
+        or None. Results are added to the index, so the search is done once"""
+
+        plugins = self.getPlugins()[kind]
+        name = name.lower()
+        if name not in plugins:
+            for key in list(plugins):
+                if name in key:
+                    plugins[name] = plugins[key]
+                    break
+            else:
+                return None
+        return plugins[name]
+
+    def findSerializer(self, name):
+
+        try:
+            return self.findPlugin("serializers", name)
+        except Exception:
+            # getAllSerializers might not be allowed for this user
+            return self.getSerializerByName(name)
+
+    def findDeserializer(self, schema):
+
+        return self.findPlugin("deserializers", schema)
@@ -0,0 +1,337 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2026 Yorik van Havre <yorik@uncreated.net>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+"""Tools to work with FreeCAD .FCStd files without FreeCAD
+
+The Document.xml member of the archive is stream-parsed, and the other
+members it refers to (BREP shapes, meshes, etc.) are only compared by the
+CRC and size stored in the zip directory, so they are never decompressed.
+
+This module can also be run as a git filter, to store FCStd files
+uncompressed in a repository so git can delta-compress successive
+revisions:
+
+    python FCStdTools.py clean|smudge < file.FCStd
+    python FCStdTools.py textconv file.FCStd"""
+
+import sys, shutil, hashlib, tempfile, xml.sax, zipfile
+
+__title__ = "FCStd tools"
+__author__ = "Yorik van Havre"
+__url__ = "http://www.freecadweb.org"
+
+
+PREVIEWSIZE = 80 # characters of a property value kept for display
+DOCUMENT = "<Document>" # name under which document properties are stored
+FIRSTMEMBERS = ["Document.xml", "GuiDocument.xml"] # written first, like FreeCAD does
+TIMESTAMP = (1980, 1, 1, 0, 0, 0) # the earliest date a zip file can store
+SPOOLSIZE = 64*1048576 # bytes of a filtered file kept in memory before spilling to disk
+
+
+class PropertyValue:
+
+    """The value of a property: its type, a digest of its whole contents
+    and a short text preview"""
+
+    __slots__ = ["type", "digest", "preview"]
+
+    def __init__(self, type, digest, preview):
+
+        self.type = type
+        self.digest = digest
+        self.preview = preview
+
+    def __eq__(self, other):
+
+        if not isinstance(other, PropertyValue):
+            return False
+        return (self.type, self.digest) == (other.type, other.digest)
+
+    def __ne__(self, other):
+
+        return not self == other
+
+
+class DocumentObject:
+
+    """An object of a document: its name, type, label and properties"""
+
+    __slots__ = ["name", "type", "label", "properties"]
+
+    def __init__(self, name, type=None):
+
+        self.name = name
+        self.type = type
+        self.label = None
+        self.properties = {}
+
+    def __repr__(self):
+
+        return "<DocumentObject %s (%s)>" % (self.name, self.type)
+
+
+class DocumentReader(xml.sax.ContentHandler):
+
+    """Builds a dictionary of DocumentObjects from Document.xml. members is
+    a dictionary of {filename: digest} of the archive members, used in place
+    of the file attributes of properties"""
+
+    def __init__(self, members=None):
+
+        self.members = members or {}
+        self.objects = {DOCUMENT: DocumentObject(DOCUMENT, "App::Document")}
+        self.section = None # Objects or ObjectData
+        self.object = self.objects[DOCUMENT]
+        self.property = None
+        self.depth = 0 # depth of elements inside the current property
+
+    def getObject(self, name):
+
+        if not name in self.objects:
+            self.objects[name] = DocumentObject(name)
+        return self.objects[name]
+
+    def startElement(self, tag, attributes):
+
+        if self.property:
+            self.depth += 1
+            text = [tag]
+            for key in sorted(attributes.keys()):
+                value = attributes[key]
+                if (key == "file") and (value in self.members):
+                    # compare referenced members by contents, not by name
+                    self.hash.update(("%s=%s " % (key, self.members[value])).encode("utf-8"))
+                else:
+                    self.hash.update(("%s=%s " % (key, value)).encode("utf-8"))
+                if key.lower() != "count":
+                    text.append(value)
+            self.hash.update(tag.encode("utf-8") + b"\n")
+            self.addPreview(" ".join(text) if len(text) > 2 else text[-1])
+            if (self.property[0] == "Label") and ("value" in attributes):
+                self.object.label = attributes["value"]
+        elif tag in ("Objects", "ObjectData"):
+            self.section = tag
+        elif tag == "Object":
+            if self.section == "Objects":
+                self.getObject(attributes["name"]).type = attributes.get("type")
+            elif self.section == "ObjectData":
+                self.object = self.getObject(attributes["name"])
+        elif tag == "Property":
+            self.property = (attributes["name"], attributes.get("type"), [])
+            self.hash = hashlib.sha1()
+            self.depth = 0
+
+    def characters(self, content):
+
+        if self.property and content.strip():
+            self.hash.update(content.encode("utf-8"))
+            self.addPreview(content.strip())
+
+    def addPreview(self, text):
+
+        preview = self.property[2]
+        if sum([len(t) for t in preview]) < PREVIEWSIZE:
+            preview.append(text)
+
+    def endElement(self, tag):
+
+        if self.property:
+            if self.depth:
+                self.depth -= 1
+            elif tag == "Property":
+                name, type, preview = self.property
+                preview = " ".join(preview)
+                if len(preview) > PREVIEWSIZE:
+                    preview = preview[:PREVIEWSIZE-3] + "..."
+                self.object.properties[name] = PropertyValue(type, self.hash.hexdigest(), preview)
+                self.property = None
+        elif tag in ("Objects", "ObjectData"):
+            self.section = None
+        elif (tag == "Object") and (self.section == "ObjectData"):
+            self.object = self.objects[DOCUMENT]
+
+
+def readDocument(f):
+
+    """Returns a dictionary of {name: DocumentObject} of the objects of an
+    FCStd file, given as a path or a seekable file object. The document's
+    own properties are under the DOCUMENT name"""
+
+    with zipfile.ZipFile(f) as zf:
+        members = {}
+        for info in zf.infolist():
+            members[info.filename] = "%08x:%i" % (info.CRC, info.file_size)
+        handler = DocumentReader(members)
+        with zf.open("Document.xml") as xmlfile:
+            xml.sax.parse(xmlfile, handler)
+    return handler.objects
+
+
+class DocumentDiff:
+
+    """The differences between two documents: lists of added and removed
+    DocumentObjects, and a list of (old, new, [property names]) of the
+    changed ones"""
+
+    def __init__(self):
+
+        self.added = []
+        self.removed = []
+        self.changed = []
+
+    def __bool__(self):
+
+        return bool(self.added or self.removed or self.changed)
+
+    def format(self):
+
+        """Returns a textual representation of this diff"""
+
+        def title(obj):
+            if obj.label and (obj.label != obj.name):
+                return "%s \"%s\" (%s)" % (obj.name, obj.label, obj.type)
+            return "%s (%s)" % (obj.name, obj.type)
+
+        lines = []
+        for obj in self.removed:
+            lines.append("- " + title(obj))
+        for obj in self.added:
+            lines.append("+ " + title(obj))
+        for old, new, names in self.changed:
+            lines.append("~ " + title(new))
+            if old.type != new.type:
+                lines.append("    type: %s -> %s" % (old.type, new.type))
+            for name in names:
+                a = old.properties.get(name)
+                b = new.properties.get(name)
+                if not a:
+                    lines.append("    + %s: %s" % (name, b.preview))
+                elif not b:
+                    lines.append("    - %s: %s" % (name, a.preview))
+                elif a.preview != b.preview:
+                    lines.append("    %s: %s -> %s" % (name, a.preview, b.preview))
+                else:
+                    lines.append("    %s: changed" % name)
+        return "\n".join(lines)
+
+
+def diffDocuments(old, new):
+
+    """Compares two FCStd files, given as paths or seekable file objects,
+    and returns a DocumentDiff. Any of them can be None if the file doesn't
+    exist on that side"""
+
+    old = readDocument(old) if old else {}
+    new = readDocument(new) if new else {}
+    diff = DocumentDiff()
+    for name, obj in old.items():
+        if (not name in new) and (name != DOCUMENT):
+            diff.removed.append(obj)
+    for name, obj in new.items():
+        if not name in old:
+            if name != DOCUMENT:
+                diff.added.append(obj)
+            continue
+        before = old[name]
+        names = set(before.properties.keys()) | set(obj.properties.keys())
+        names = [n for n in sorted(names) if before.properties.get(n) != obj.properties.get(n)]
+        if names or (before.type != obj.type):
+            diff.changed.append((before, obj, names))
+    return diff
+
+
+def normalize(infile, outfile, compression=zipfile.ZIP_STORED):
+
+    """Rewrites the FCStd file object infile to the seekable file object
+    outfile, with the given compression, a fixed member order and fixed
+    timestamps and attributes, so the same document always gives the same
+    bytes. Members are copied one at a time, without loading them in
+    memory"""
+
+    with zipfile.ZipFile(infile) as zin:
+        def order(info):
+            if info.filename in FIRSTMEMBERS:
+                return (FIRSTMEMBERS.index(info.filename), info.filename)
+            return (len(FIRSTMEMBERS), info.filename)
+        infos = sorted(zin.infolist(), key=order)
+        with zipfile.ZipFile(outfile, "w", compression) as zout:
+            for info in infos:
+                if info.is_dir():
+                    continue
+                zinfo = zipfile.ZipInfo(info.filename, TIMESTAMP)
+                zinfo.compress_type = compression
+                zinfo.create_system = 3
+                zinfo.external_attr = 0o100644 << 16
+                with zin.open(info) as src:
+                    with zout.open(zinfo, "w", force_zip64=info.file_size >= zipfile.ZIP64_LIMIT) as dst:
+                        shutil.copyfileobj(src, dst, 1048576)
+
+
+def runFilter(compression, stdin, stdout):
+
+    """Reads a FCStd file from stdin and writes it normalized to stdout.
+    Data that isn't a zip file, like a Git LFS pointer, is passed through"""
+
+    with tempfile.SpooledTemporaryFile(SPOOLSIZE) as infile:
+        shutil.copyfileobj(stdin, infile)
+        infile.seek(0)
+        if not zipfile.is_zipfile(infile):
+            infile.seek(0)
+            shutil.copyfileobj(infile, stdout)
+            return
+        infile.seek(0)
+        with tempfile.SpooledTemporaryFile(SPOOLSIZE) as outfile:
+            normalize(infile, outfile, compression)
+            outfile.seek(0)
+            shutil.copyfileobj(outfile, stdout)
+
+
+def textconv(path, stdout):
+
+    """Writes a text representation of a FCStd file to stdout, for git diff:
+    its Document.xml followed by the list of its members"""
+
+    with zipfile.ZipFile(path) as zf:
+        with zf.open("Document.xml") as xmlfile:
+            shutil.copyfileobj(xmlfile, stdout)
+        stdout.write(b"\n")
+        for info in sorted(zf.infolist(), key=lambda i: i.filename):
+            stdout.write(("%s %08x %i\n" % (info.filename, info.CRC, info.file_size)).encode("utf-8"))
+
+
+def main(args):
+
+    if args[:1] == ["clean"]:
+        runFilter(zipfile.ZIP_STORED, sys.stdin.buffer, sys.stdout.buffer)
+    elif args[:1] == ["smudge"]:
+        runFilter(zipfile.ZIP_DEFLATED, sys.stdin.buffer, sys.stdout.buffer)
+    elif (args[:1] == ["textconv"]) and (len(args) == 2):
+        textconv(args[1], sys.stdout.buffer)
+    else:
+        sys.stderr.write(__doc__.split("\n\n")[-1] + "\n")
+        return 1
+    sys.stdout.buffer.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
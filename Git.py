@@ -20,7 +20,7 @@
 #*                                                                         *
 #***************************************************************************
 
-import FreeCAD, os, time, tempfile, base64, Draft
+import FreeCAD, os, time, tempfile, base64, collections, Draft
 from PySide import QtCore, QtGui
 
 if FreeCAD.GuiUp:
@@ -80,9 +80,238 @@ class CommandGit:
             FreeCADGui.Control.showDialog(GitTaskPanel(repo))
 
 
-class GitTaskPanel:
+def isTemporary(path):
+    "returns True if the given path only exists while FreeCAD runs, like the mounted folder of an AppImage"
+    path = os.path.realpath(path)
+    folders = [tempfile.gettempdir()]
+    if os.environ.get("APPDIR"):
+        folders.append(os.environ["APPDIR"])
+    for folder in folders:
+        folder = os.path.realpath(folder)
+        if os.path.commonprefix([path,folder+os.sep]) == folder+os.sep:
+            return True
+    return False
+
+
+def getPython():
+    "returns the command of a python interpreter that git can run filters with, which stays valid after FreeCAD exits"
+    import sys, shutil
+    candidates = []
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        candidates.append(sys.executable)
+    # inside FreeCAD, sys.executable is FreeCAD itself
+    for d in [os.path.dirname(sys.executable),os.path.join(sys.prefix,"bin"),sys.prefix]:
+        for n in ["python3","python","python.exe"]:
+            candidates.append(os.path.join(d,n))
+    for c in candidates:
+        if os.path.isfile(c) and not isTemporary(c):
+            return c
+    # FCStdTools.py only needs the standard library, so any python found
+    # by git at run time will do
+    for n in ["python3","python"]:
+        if shutil.which(n):
+            return n
+    return "python3"
+
+
+def getFilterScript(repo):
+    "returns the path of FCStdTools.py for the filter, copied into the .git folder if this one is temporary"
+    import shutil
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),"FCStdTools.py")
+    if isTemporary(script):
+        copy = os.path.join(repo.git_dir,"FCStdTools.py")
+        shutil.copyfile(script,copy)
+        return copy
+    return script
+
+
+class LogModel(QtCore.QAbstractListModel):
+
+    """A list model of the commits of a repo, optionally only the ones that
+    change a given file. Commits are read one page at a time, as the view
+    scrolls down. Only their shas are kept, the displayed texts of the last
+    viewed pages are cached and rebuilt when scrolling back further"""
+
+    PageSize = 100 # rows added at a time
+    MaxPages = 20 # pages of texts kept in memory
+    MaxWalk = 2000 # commits read per step while looking for the ones of a file
+
+    def __init__(self,reader,path=None):
+        QtCore.QAbstractListModel.__init__(self)
+        self.reader = reader
+        self.path = path
+        self.shas = []
+        self.pages = collections.OrderedDict()
+        self.walker = None
+
+    def reset(self,path=None):
+        self.beginResetModel()
+        self.path = path
+        self.shas = []
+        self.pages.clear()
+        self.walker = self.reader.walk("HEAD",path)
+        self.endResetModel()
+
+    def rowCount(self,parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.shas)
+
+    def canFetchMore(self,parent=QtCore.QModelIndex()):
+        return (self.walker is not None) and not parent.isValid()
+
+    def fetchMore(self,parent=QtCore.QModelIndex()):
+        found = []
+        try:
+            for i in range(self.MaxWalk):
+                step = next(self.walker,None)
+                if step is None:
+                    self.walker = None
+                    break
+                commit,changed = step
+                if changed:
+                    found.append(commit.sha)
+                    if len(found) >= self.PageSize:
+                        break
+        except Exception:
+            FreeCAD.Console.PrintWarning(translate("WebTools","Warning: Unable to get log for this repo")+"\n")
+            self.walker = None
+        if found:
+            first = len(self.shas)
+            self.beginInsertRows(QtCore.QModelIndex(),first,first+len(found)-1)
+            self.shas.extend(found)
+            # the last page is incomplete and must be rebuilt
+            self.pages.pop(first//self.PageSize,None)
+            self.endInsertRows()
+        elif self.walker is not None:
+            # nothing found yet, go on without blocking the GUI
+            QtCore.QTimer.singleShot(0,self.fetchMoreLater)
+
+    def fetchMoreLater(self):
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def getPage(self,page):
+        if page in self.pages:
+            self.pages.move_to_end(page)
+        else:
+            rows = []
+            for sha in self.shas[page*self.PageSize:(page+1)*self.PageSize]:
+                c = self.reader.readCommit(sha)
+                rows.append((c.getDate()+" "+c.summary,sha[:8]+" "+c.author))
+            self.pages[page] = rows
+            while len(self.pages) > self.MaxPages:
+                self.pages.popitem(last=False)
+        return self.pages[page]
+
+    def data(self,index,role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or (index.row() >= len(self.shas)):
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return self.getPage(index.row()//self.PageSize)[index.row()%self.PageSize][0]
+        elif role == QtCore.Qt.ToolTipRole:
+            return self.getPage(index.row()//self.PageSize)[index.row()%self.PageSize][1]
+        return None
+
+
+class RemoteTaskPanel:
+
+    '''Base of the Git task panels, runs long git operations in a
+    background Worker and reports their progress in the labelStatus,
+    progressBar and buttonCancel widgets of the form'''
+
+    def startWorker(self):
+        from WebToolsUtils import Worker
+        self.Worker = Worker()
+        self.Process = None
+        self.Cancelled = False
+        QtCore.QObject.connect(self.form.buttonCancel, QtCore.SIGNAL("clicked()"), self.cancel)
+        self.resetProgress()
+
+    def stopWorker(self):
+        self.cancel()
+        self.Worker.cancel()
+
+    def runProcess(self,func,callback,finished=None):
+        """runs func(progress,started) in the background, where progress is
+        a GitPython RemoteProgress and started must be called with the git
+        process, so it can be cancelled. Then callback(result) is called,
+        and finished() if given, even if func failed"""
+        import GitBackend
+        Progress = GitBackend.getProgressClass()
+        def started(process):
+            self.Process = process
+        def progress(operation,current,maximum,message):
+            self.Worker.post(self.showProgress,(operation,current,maximum,message))
+        def run():
+            return func(Progress(progress),started)
+        def done(result):
+            self.resetProgress()
+            callback(result)
+            if finished:
+                finished()
+        def error(e):
+            cancelled = self.Cancelled
+            self.resetProgress()
+            if cancelled:
+                FreeCAD.Console.PrintWarning(translate("WebTools","Operation cancelled")+"\n")
+                self.form.labelStatus.setText(translate("WebTools","Cancelled"))
+            else:
+                FreeCAD.Console.PrintError(str(getattr(e,"stderr","") or e)+"\n")
+                self.form.labelStatus.setText(translate("WebTools","Error, see the report view"))
+            if finished:
+                finished()
+        self.resetProgress()
+        self.setButtons(False)
+        self.form.progressBar.setMaximum(0)
+        self.form.progressBar.show()
+        self.form.buttonCancel.show()
+        self.Worker.run(run,done,error)
+
+    def showProgress(self,progress):
+        operation,current,maximum,message = progress
+        text = translate("WebTools",operation)
+        if maximum:
+            text += " %i/%i" % (current,maximum)
+            self.form.progressBar.setMaximum(int(maximum))
+            self.form.progressBar.setValue(int(current))
+        else:
+            # unknown amount of work, Qt shows a busy indicator
+            self.form.progressBar.setMaximum(0)
+        if message:
+            text += ", "+message
+        self.form.labelStatus.setText(text)
+
+    def resetProgress(self):
+        self.Process = None
+        self.Cancelled = False
+        self.form.progressBar.setMaximum(100)
+        self.form.progressBar.setValue(0)
+        self.form.progressBar.hide()
+        self.form.buttonCancel.hide()
+        self.setButtons(True)
+
+    def setButtons(self,enabled):
+        "enables or disables the buttons that can't be used while a git process runs"
+        pass
+
+    def cancel(self):
+        if self.Process:
+            self.Cancelled = True
+            self.form.labelStatus.setText(translate("WebTools","Cancelling..."))
+            try:
+                self.Process.proc.terminate()
+            except Exception:
+                pass
+
+
+class GitTaskPanel(RemoteTaskPanel):
     
     '''The TaskPanel for the Git command'''
+
+    MaxWatched = 2000 # directories of the working tree watched for changes
+    MaxWatchedFiles = 4000 # files watched for changes made in place
+    Delay = 150 # milliseconds to wait for more changes before updating
     
     def __init__(self,repo):
         self.form = FreeCADGui.PySideUic.loadUi(os.path.join(os.path.dirname(__file__),"ui","TaskGit.ui"))
@@ -94,48 +323,203 @@ class GitTaskPanel:
         QtCore.QObject.connect(self.form.buttonCommit, QtCore.SIGNAL("clicked()"), self.commit)
         QtCore.QObject.connect(self.form.buttonPush, QtCore.SIGNAL("clicked()"), self.push)
         QtCore.QObject.connect(self.form.buttonPull, QtCore.SIGNAL("clicked()"), self.pull)
+        QtCore.QObject.connect(self.form.buttonFetch, QtCore.SIGNAL("clicked()"), self.fetch)
+        QtCore.QObject.connect(self.form.buttonFilter, QtCore.SIGNAL("clicked()"), self.installFilter)
+        QtCore.QObject.connect(self.form.buttonLFS, QtCore.SIGNAL("clicked()"), self.installLFS)
+        QtCore.QObject.connect(self.form.checkLogFilter, QtCore.SIGNAL("toggled(bool)"), self.getLog)
+        import GitBackend
         self.repo = repo
+        self.reader = GitBackend.ObjectReader(repo)
+        self.logModel = LogModel(self.reader)
+        self.form.logView.setModel(self.logModel)
+        self.startWorker()
+        self.LFS = GitBackend.hasLFS(repo)
+        self.LFSPatterns = GitBackend.getLFSPatterns(repo) if self.LFS else []
+        self.LFSFiles = {}
+        self.LFSPaths = set()
+        self.setFilterButtons()
+        if not self.LFS:
+            self.form.buttonLFS.setToolTip(translate("WebTools","Git LFS is not installed"))
         self.getRemotes()
         self.getFiles()
         self.getLog()
+        self.startWatching()
 
     def getStandardButtons(self):
         return int(QtGui.QDialogButtonBox.Close)
 
     def accept(self):
+        self.Timer.stop()
+        self.Watcher.removePaths(self.Watcher.directories())
+        if self.Watcher.files():
+            self.Watcher.removePaths(self.Watcher.files())
+        self.stopWorker()
+        self.reader.close()
         FreeCADGui.Control.closeDialog()
+
+    def reject(self):
+        self.accept()
         
-    def getFiles(self):
+    def getFiles(self,lock=True):
+        import GitBackend
         self.form.labelStatus.setText("")
         self.form.listFiles.clear()
-        self.modified = self.repo.git.diff("--name-only").split("\n")
-        self.untracked = self.repo.git.ls_files("--other","--exclude-standard").split("\n")
-        for f in self.modified:
-            if f:
-                self.form.listFiles.addItem(f)
-        for f in self.untracked:
-            if f:
-                self.form.listFiles.addItem(f+" *")
-        self.form.labelStatus.setText(translate("WebTools","Branch")+": "+self.repo.active_branch.name)
-
-    def getLog(self):
-        try:
-            l = self.repo.git.log("-n 25","--date=format:%Y.%m.%d","--pretty=format:%ad %s")
-        except:
-            FreeCAD.Console.PrintWarning(translate("WebTools","Warning: Unable to get log for this repo")+"\n")
+        self.Status = GitBackend.getStatus(self.repo,lock=lock)
+        if self.LFSPatterns:
+            self.LFSFiles = GitBackend.getLFSFiles(self.repo)
+            self.LFSPaths = GitBackend.getLFSPaths(self.repo,[f.path for f in self.Status.files])
+        for f in self.Status.files:
+            self.form.listFiles.addItem(self.getLabel(f))
+        self.setBranchLabel(self.Status)
+
+    def updateFiles(self,paths):
+        "updates the files list for the given paths only, without rebuilding it"
+        import GitBackend
+        status = GitBackend.getStatus(self.repo,paths,lock=False)
+        found = dict([(f.path,f) for f in status.files])
+        if self.LFSPatterns:
+            self.LFSPaths -= set(found)
+            self.LFSPaths |= GitBackend.getLFSPaths(self.repo,list(found))
+        def inPaths(path):
+            for p in paths:
+                if (path == p) or path.startswith(p+"/"):
+                    return True
+            return False
+        for row in reversed(range(len(self.Status.files))):
+            f = self.Status.files[row]
+            if inPaths(f.path) or (f.origPath and inPaths(f.origPath)):
+                if f.path in found:
+                    f = found.pop(f.path)
+                    self.Status.files[row] = f
+                    self.form.listFiles.item(row).setText(self.getLabel(f))
+                else:
+                    del self.Status.files[row]
+                    self.form.listFiles.takeItem(row)
+        for f in status.files:
+            if f.path in found:
+                self.Status.files.append(f)
+                self.form.listFiles.addItem(self.getLabel(f))
+        self.Status.oid = status.oid
+        self.Status.branch = status.branch
+        self.Status.upstream = status.upstream
+        self.Status.ahead = status.ahead
+        self.Status.behind = status.behind
+        self.setBranchLabel(status)
+
+    def setBranchLabel(self,status):
+        branch = status.branch or translate("WebTools","detached")
+        if status.ahead or status.behind:
+            branch += " (+%i -%i)" % (status.ahead,status.behind)
+        self.form.labelStatus.setText(translate("WebTools","Branch")+": "+branch)
+
+    def startWatching(self):
+        "watches the working tree and the git folder, to update the files list when they change"
+        import GitBackend
+        self.Stats = GitBackend.StatCache(self.repo.working_dir)
+        self.Changed = set()
+        self.GitChanged = False
+        self.Timer = QtCore.QTimer()
+        self.Timer.setSingleShot(True)
+        self.Timer.setInterval(self.Delay)
+        QtCore.QObject.connect(self.Timer, QtCore.SIGNAL("timeout()"), self.onChanges)
+        self.Watcher = QtCore.QFileSystemWatcher()
+        QtCore.QObject.connect(self.Watcher, QtCore.SIGNAL("directoryChanged(QString)"), self.onDirectoryChanged)
+        QtCore.QObject.connect(self.Watcher, QtCore.SIGNAL("fileChanged(QString)"), self.onFileChanged)
+        dirs = self.Stats.listDirectories(self.MaxWatched)
+        self.Watcher.addPaths([os.path.join(self.repo.working_dir,d) for d in dirs]+[self.repo.git_dir])
+        # directories only report added, removed and renamed entries, files
+        # written in place must be watched themselves
+        files = self.Stats.listFiles(dirs,self.MaxWatchedFiles)
+        if files:
+            self.Watcher.addPaths([os.path.join(self.repo.working_dir,f) for f in files])
+
+    def onDirectoryChanged(self,path):
+        if os.path.normpath(path) == os.path.normpath(self.repo.git_dir):
+            # commit, checkout, stage... from anywhere
+            self.GitChanged = True
         else:
-            #textform = FreeCADGui.PySideUic.loadUi(os.path.join(os.path.dirname(__file__),"ui","DialogDisplayText.ui"))
-            #textform.setWindowTitle("Git log")
-            #textform.browserText.setPlainText(l)
-            #textform.exec_()
-            self.form.logView.clear()
-            self.form.logView.addItems(l.split("\n"))
-            
-        
+            d = os.path.relpath(path,self.repo.working_dir).replace(os.sep,"/")
+            self.Changed.add("" if d == "." else d)
+        # wait for the burst of changes to settle
+        self.Timer.start()
+
+    def onFileChanged(self,path):
+        # the scan of its directory finds its new size or date
+        self.onDirectoryChanged(os.path.dirname(path))
+
+    def onChanges(self):
+        dirs = self.Changed
+        self.Changed = set()
+        paths = set()
+        for d in dirs:
+            paths |= self.Stats.scan(d)
+        files = set(self.Watcher.files())
+        for p in paths:
+            path = os.path.join(self.repo.working_dir,p)
+            if os.path.isdir(path):
+                self.Stats.scan(p)
+                self.Watcher.addPath(path)
+            elif os.path.isfile(path) and not path in files and len(files) < self.MaxWatchedFiles:
+                # new files, or files replaced by a rename, which drops their watch
+                files.add(path)
+                self.Watcher.addPath(path)
+        if self.Process:
+            # a remote operation is running, it refreshes everything when over
+            self.GitChanged = False
+            return
+        if self.GitChanged:
+            self.GitChanged = False
+            oid = self.Status.oid
+            self.getFiles(lock=False)
+            if self.Status.oid != oid:
+                self.getLog()
+        elif paths:
+            self.updateFiles(sorted(paths))
+
+    def getLabel(self,f):
+        "returns the text shown in the files list for the given FileStatus"
+        label = f.path
+        if f.untracked:
+            label += " *"
+        elif f.origPath:
+            label += " <- "+f.origPath
+        elif f.deleted:
+            label += " ("+translate("WebTools","deleted")+")"
+        if f.staged:
+            label += " ["+translate("WebTools","staged")+"]"
+        if f.path in self.LFSPaths:
+            if self.LFSFiles.get(f.path,True):
+                label += " [LFS]"
+            else:
+                # only the pointer file is in the working tree
+                label += " ["+translate("WebTools","LFS pointer")+"]"
+        return label
+
+    def getLog(self,*args):
+        path = None
+        if self.form.checkLogFilter.isChecked():
+            path = self.getDocumentPath()
+        self.logModel.reset(path)
+
+    def getDocumentPath(self):
+        "returns the path of the active document relative to the repo, or None"
+        if FreeCAD.ActiveDocument and FreeCAD.ActiveDocument.FileName:
+            path = os.path.relpath(FreeCAD.ActiveDocument.FileName,self.repo.working_dir)
+            if not path.startswith(".."):
+                return path.replace(os.sep,"/")
+        return None
+
     def getDiff(self):
         if (self.form.listFiles.currentRow() >= 0):
-            f = (self.modified+self.untracked)[self.form.listFiles.currentRow()]
-            d = self.repo.git.diff(f)
+            f = self.Status.files[self.form.listFiles.currentRow()].path
+            if f.lower().endswith(".fcstd"):
+                d = self.getDocumentDiff(f)
+            elif self.Status.oid:
+                # include the staged changes. git diff applies the eol
+                # conversion, clean filters and textconv of the file
+                d = self.repo.git.diff("HEAD","--",f)
+            else:
+                d = self.repo.git.diff("--cached","--",f)
             if d:
                 textform = FreeCADGui.PySideUic.loadUi(os.path.join(os.path.dirname(__file__),"ui","DialogDisplayText.ui"))
                 textform.setWindowTitle("Diff: "+f)
@@ -144,6 +528,88 @@ class GitTaskPanel:
             else:
                 FreeCAD.Console.PrintWarning(translate("WebTools","Warning: Unable to get diff:")+str(f)+"\n")
             
+    def getDocumentDiff(self,f):
+        "returns a diff of the objects and properties of a FCStd file since HEAD"
+        import FCStdTools
+        path = os.path.join(self.repo.working_dir,f)
+        if not os.path.exists(path):
+            path = None
+        with tempfile.TemporaryFile() as old:
+            if not (self.Status.oid and self.reader.readToFile("HEAD:"+f,old)):
+                old = None
+            try:
+                return FCStdTools.diffDocuments(old,path).format()
+            except Exception as e:
+                FreeCAD.Console.PrintWarning(translate("WebTools","Unable to read the document")+": "+str(e)+"\n")
+                return ""
+
+    def hasFilter(self):
+        "returns True if the FCStd filter is configured in this repo"
+        import shlex
+        try:
+            command = shlex.split(self.repo.git.config("--get","filter.fcstd.clean"))
+        except:
+            return False
+        # a filter installed from a former AppImage run points to files
+        # that are gone, it can be installed again
+        return all(os.path.exists(a) for a in command[:2] if os.path.isabs(a))
+
+    def setFilterButtons(self):
+        "enables the LFS and FCStd filter buttons if they can still be installed"
+        import GitBackend
+        filters = GitBackend.getFilters(self.repo,GitBackend.LFSPATTERNS)
+        # both set the filter of FCStd files, only one of them can be used
+        fcstd = [filters[p] for p in ["*.FCStd","*.fcstd"]]
+        self.form.buttonFilter.setEnabled(not (self.hasFilter() or ("lfs" in fcstd)))
+        self.form.buttonLFS.setEnabled(self.LFS and ("unspecified" in filters.values()))
+
+    def installFilter(self):
+        "configures FCStdTools.py as clean, smudge and textconv filter for FCStd files"
+        import GitBackend
+        if "lfs" in GitBackend.getFilters(self.repo,["*.FCStd","*.fcstd"]).values():
+            FreeCAD.Console.PrintError(translate("WebTools","FCStd files of this repository are stored with Git LFS, which can't be combined with the FCStd filter.")+"\n")
+            return
+        script = getFilterScript(self.repo).replace("\\","/")
+        command = "\""+getPython().replace("\\","/")+"\" \""+script+"\" "
+        self.repo.git.config("filter.fcstd.clean",command+"clean")
+        self.repo.git.config("filter.fcstd.smudge",command+"smudge")
+        # a filter that can't run fails the checkout or commit, instead of
+        # storing or writing the files unfiltered
+        self.repo.git.config("filter.fcstd.required","true")
+        self.repo.git.config("diff.fcstd.textconv",command+"textconv")
+        attributes = os.path.join(self.repo.working_dir,".gitattributes")
+        lines = []
+        if os.path.exists(attributes):
+            with open(attributes) as f:
+                lines = f.read().splitlines()
+        with open(attributes,"a") as f:
+            for pattern in ["*.FCStd","*.fcstd"]:
+                line = pattern+" filter=fcstd diff=fcstd"
+                if not line in lines:
+                    f.write(line+"\n")
+        FreeCAD.Console.PrintMessage(translate("WebTools","FCStd filter installed. FCStd files will be stored uncompressed from their next commit on.")+"\n")
+        self.setFilterButtons()
+        self.getFiles()
+
+    def installLFS(self):
+        "tracks CAD files with Git LFS in this repo"
+        import GitBackend
+        filters = GitBackend.getFilters(self.repo,GitBackend.LFSPATTERNS)
+        # a later line of .gitattributes would silently replace the other filter
+        patterns = [p for p in GitBackend.LFSPATTERNS if filters[p] in ["unspecified","lfs"]]
+        skipped = [p for p in GitBackend.LFSPATTERNS if not p in patterns]
+        if skipped:
+            FreeCAD.Console.PrintWarning(translate("WebTools","These files already use another filter and are not tracked with Git LFS:")+" "+", ".join(skipped)+"\n")
+        try:
+            GitBackend.trackLFS(self.repo,patterns)
+        except Exception as e:
+            FreeCAD.Console.PrintError(translate("WebTools","Unable to set up Git LFS")+": "+str(e)+"\n")
+            return
+        self.LFSPatterns = GitBackend.getLFSPatterns(self.repo)
+        FreeCAD.Console.PrintMessage(translate("WebTools","CAD files are now tracked with Git LFS. Files already committed stay in the history as they are.")+"\n")
+        self.setFilterButtons()
+        self.getFiles()
+
     def getRemotes(self):
         self.form.listRepos.clear()
         if self.repo.remotes:
@@ -161,13 +627,18 @@ class GitTaskPanel:
             FreeCAD.Console.PrintError(translate("WebTools","Please write a commit message.")+"\n")
             self.form.labelStatus.setText(translate("WebTools","No commit message"))
             return
-        for it in self.form.listFiles.selectedItems():
-            f = it.text()
-            if f[-2:] == " *":
-                f = f[:-2]
-            self.repo.git.add(f)
+        import GitBackend
+        files = [self.Status.files[self.form.listFiles.row(it)] for it in self.form.listFiles.selectedItems()]
+        t0 = time.time()
+        GitBackend.stage(self.repo,GitBackend.getStagePaths(files))
+        t1 = time.time()
+        # the trees are cached in the index, commit doesn't compute them again
+        self.repo.git.write_tree()
+        t2 = time.time()
         s = self.repo.git.commit(m=self.form.editMessage.text())
+        t3 = time.time()
         FreeCAD.Console.PrintMessage(translate("WebTools","Successfully committed %i files.") % len(self.form.listFiles.selectedItems()) + "\n")
+        FreeCAD.Console.PrintMessage("Git commit: stage %.3fs, write-tree %.3fs, commit %.3fs\n" % (t1-t0,t2-t1,t3-t2))
         self.form.labelStatus.setText(translate("WebTools","Files committed."))
         if s:
             FreeCAD.Console.PrintMessage(s+"\n")
@@ -175,37 +646,214 @@ class GitTaskPanel:
         self.getFiles()
         self.getLog()
         
-    def push(self):
+    def getRemote(self,message):
+        "returns the name of the selected remote, or None"
         if len(self.form.listRepos.selectedItems()) != 1:
-            FreeCAD.Console.PrintError(translate("WebTools","Please select a repo to push to.")+"\n")
+            FreeCAD.Console.PrintError(message+"\n")
             self.form.labelStatus.setText(translate("WebTools","No repo selected"))
-            return
-        self.form.labelStatus.setText(translate("WebTools","Pushing files..."))
-        r = self.form.listRepos.selectedItems()[0].text().split(":")[0]
-        s = self.repo.git.push(r)
-        FreeCAD.Console.PrintMessage(translate("WebTools","Successfully pushed to")+" "+r+"\n")
-        self.form.labelStatus.setText(translate("WebTools","Files pushed."))
-        if s:
-            FreeCAD.Console.PrintMessage(s+"\n")
+            return None
+        return self.form.listRepos.selectedItems()[0].text().split(":")[0]
+
+    def runRemote(self,command,remote,callback):
+        "runs git fetch, pull or push in the background, then callback(output) and a refresh"
+        import GitBackend
+        def run(progress,started):
+            env = None
+            if (command == "pull") and self.LFSPatterns:
+                # download LFS objects afterwards in one parallel batch,
+                # instead of one by one while checking out files
+                env = {"GIT_LFS_SKIP_SMUDGE":"1"}
+            s = GitBackend.runRemote(self.repo,command,remote,progress,started,env)
+            if env:
+                progress.callback("Downloading LFS objects",0,None,"")
+                s += "\n"+GitBackend.pullLFS(self.repo,remote,started)
+            return s
+        self.runProcess(run,callback,self.refresh)
+
+    def setButtons(self,enabled):
+        for button in [self.form.buttonFetch,self.form.buttonPull,self.form.buttonPush]:
+            button.setEnabled(enabled)
+
+    def refresh(self):
+        "updates the files list and the log once a remote operation is over"
         self.getFiles()
-        
+        self.getLog()
+
+    def fetch(self):
+        r = self.getRemote(translate("WebTools","Please select a repo to fetch from."))
+        if r:
+            self.form.labelStatus.setText(translate("WebTools","Fetching..."))
+            def onFetched(s):
+                FreeCAD.Console.PrintMessage(translate("WebTools","Successfully fetched from")+" "+r+"\n")
+                if s:
+                    FreeCAD.Console.PrintMessage(s+"\n")
+            self.runRemote("fetch",r,onFetched)
+
+    def push(self):
+        r = self.getRemote(translate("WebTools","Please select a repo to push to."))
+        if r:
+            self.form.labelStatus.setText(translate("WebTools","Pushing files..."))
+            def onPushed(s):
+                FreeCAD.Console.PrintMessage(translate("WebTools","Successfully pushed to")+" "+r+"\n")
+                if s:
+                    FreeCAD.Console.PrintMessage(s+"\n")
+            self.runRemote("push",r,onPushed)
+
     def pull(self):
-        if len(self.form.listRepos.selectedItems()) != 1:
-            FreeCAD.Console.PrintError(translate("WebTools","Please select a repo to pull from.")+"\n")
-            self.form.labelStatus.setText(translate("WebTools","No repo selected"))
+        r = self.getRemote(translate("WebTools","Please select a repo to pull from."))
+        if r:
+            self.form.labelStatus.setText(translate("WebTools","Pulling files..."))
+            def onPulled(s):
+                FreeCAD.Console.PrintMessage(translate("WebTools","Successfully pulled from")+" "+r+"\n")
+                if s:
+                    FreeCAD.Console.PrintMessage(s+"\n")
+                if FreeCAD.ActiveDocument and os.path.basename(FreeCAD.ActiveDocument.FileName) in s:
+                    FreeCAD.Console.PrintWarning(translate("WebTools","Warning: the current document file has been changed by this pull. Please save your document to keep your changes.")+"\n")
+            self.runRemote("pull",r,onPulled)
+
+
+
+class CommandGitClone:
+
+    "the WebTools_GitClone command definition"
+
+    def GetResources(self):
+        return {'Pixmap'  : os.path.join(os.path.dirname(__file__),"icons",'git.svg'),
+                'MenuText': QtCore.QT_TRANSLATE_NOOP("WebTools_GitClone","Git clone"),
+                'ToolTip': QtCore.QT_TRANSLATE_NOOP("WebTools_GitClone","Clones a Git repository, optionally only some of its folders and part of its history")}
+
+    def Activated(self):
+        try:
+            import git
+        except Exception:
+            FreeCAD.Console.PrintError(translate("WebTools","The Python Git module was not found. Please install the python-git package.")+"\n")
             return
-        self.form.labelStatus.setText(translate("WebTools","Pulling files..."))
-        r = self.form.listRepos.selectedItems()[0].text().split(":")[0]
-        s = self.repo.git.pull(r)
-        FreeCAD.Console.PrintMessage(translate("WebTools","Successfully pulled from")+" "+r+"\n")
-        self.form.labelStatus.setText(translate("WebTools","Files pulled."))
-        if s:
-            FreeCAD.Console.PrintMessage(s+"\n")
-        if os.path.basename(FreeCAD.ActiveDocument.FileName) in s:
-            FreeCAD.Console.PrintWarning(translate("WebTools","Warning: the current document file has been changed by this pull. Please save your document to keep your changes.")+"\n")
+        FreeCADGui.Control.showDialog(GitCloneTaskPanel())
+
+
+class GitCloneTaskPanel(RemoteTaskPanel):
+
+    '''The TaskPanel for the Git clone command. The repository is first
+    cloned without checking out any file, optionally without file contents
+    and with a limited history, then only the folders chosen in its tree are
+    checked out, so only their files are downloaded'''
+
+    def __init__(self):
+        self.form = FreeCADGui.PySideUic.loadUi(os.path.join(os.path.dirname(__file__),"ui","TaskGitClone.ui"))
+        self.form.setWindowIcon(QtGui.QIcon(os.path.join(os.path.dirname(__file__),"icons","git.svg")))
+        self.form.labelStatus.setText("")
+        QtCore.QObject.connect(self.form.buttonBrowse, QtCore.SIGNAL("clicked()"), self.browse)
+        QtCore.QObject.connect(self.form.buttonClone, QtCore.SIGNAL("clicked()"), self.clone)
+        QtCore.QObject.connect(self.form.buttonCheckout, QtCore.SIGNAL("clicked()"), self.checkout)
+        QtCore.QObject.connect(self.form.treeFolders, QtCore.SIGNAL("itemExpanded(QTreeWidgetItem*)"), self.addFolders)
+        self.repo = None
+        self.reader = None
+        self.startWorker()
+        self.form.groupFolders.setEnabled(False)
+
+    def getStandardButtons(self):
+        return int(QtGui.QDialogButtonBox.Close)
+
+    def accept(self):
+        self.stopWorker()
+        if self.reader:
+            self.reader.close()
+        FreeCADGui.Control.closeDialog()
+
+    def reject(self):
+        self.accept()
+
+    def setButtons(self,enabled):
+        self.form.buttonClone.setEnabled(enabled and not self.repo)
+        self.form.buttonCheckout.setEnabled(enabled and bool(self.repo))
+
+    def browse(self):
+        d = QtGui.QFileDialog.getExistingDirectory(None,translate("WebTools","Folder to clone into"))
+        if d:
+            # clone in a new subfolder named after the repo, like git does
+            name = self.form.editURL.text().strip().rstrip("/").split("/")[-1].split(":")[-1]
+            if name.endswith(".git"):
+                name = name[:-4]
+            self.form.editPath.setText(os.path.join(d,name) if name else d)
+
+    def clone(self):
+        import GitBackend
+        url = self.form.editURL.text().strip()
+        path = self.form.editPath.text().strip()
+        if not url or not path:
+            FreeCAD.Console.PrintError(translate("WebTools","Please give the URL of the repository and the folder to clone it into.")+"\n")
+            return
+        if os.path.exists(path) and os.listdir(path):
+            FreeCAD.Console.PrintError(translate("WebTools","This folder is not empty")+": "+path+"\n")
+            return
+        partial = self.form.checkPartial.isChecked()
+        depth = self.form.spinDepth.value()
+        self.form.labelStatus.setText(translate("WebTools","Cloning..."))
+        def run(progress,started):
+            return GitBackend.clone(url,path,progress,partial,depth,started)
+        self.runProcess(run,self.onCloned)
+
+    def onCloned(self,repo):
+        import GitBackend
+        self.repo = repo
+        self.reader = GitBackend.ObjectReader(repo)
+        self.form.treeFolders.clear()
+        self.addFolders(self.form.treeFolders.invisibleRootItem(),"HEAD^{tree}")
+        self.form.groupFolders.setEnabled(True)
+        self.setButtons(True)
+        self.form.labelStatus.setText(translate("WebTools","Choose the folders to check out"))
+
+    def addFolders(self,item,tree=None):
+        "adds the subfolders of the given tree under item, the first time it is expanded"
+        if tree is None:
+            tree = item.data(0,QtCore.Qt.UserRole+1)
+            if not tree:
+                return
+            item.setData(0,QtCore.Qt.UserRole+1,None)
+        parent = item.data(0,QtCore.Qt.UserRole) # None for the root item
+        for name,isdir,sha in self.reader.listTree(tree):
+            if isdir:
+                child = QtGui.QTreeWidgetItem([name])
+                child.setFlags(child.flags() | QtCore.Qt.ItemIsUserCheckable)
+                child.setCheckState(0,QtCore.Qt.Unchecked)
+                child.setData(0,QtCore.Qt.UserRole,parent+"/"+name if parent else name)
+                child.setData(0,QtCore.Qt.UserRole+1,sha)
+                child.setChildIndicatorPolicy(QtGui.QTreeWidgetItem.ShowIndicator)
+                item.addChild(child)
+        if not item.childCount():
+            item.setChildIndicatorPolicy(QtGui.QTreeWidgetItem.DontShowIndicatorWhenChildless)
+
+    def getFolders(self,item):
+        "returns the checked folders under item, a checked folder includes its subfolders"
+        folders = []
+        for i in range(item.childCount()):
+            child = item.child(i)
+            if child.checkState(0) == QtCore.Qt.Checked:
+                folders.append(child.data(0,QtCore.Qt.UserRole))
+            else:
+                folders.extend(self.getFolders(child))
+        return folders
+
+    def checkout(self):
+        import GitBackend
+        folders = self.getFolders(self.form.treeFolders.invisibleRootItem())
+        self.form.labelStatus.setText(translate("WebTools","Checking out files..."))
+        def run(progress,started):
+            return GitBackend.sparseCheckout(self.repo,folders,progress,started)
+        self.runProcess(run,self.onCheckedOut)
 
+    def onCheckedOut(self,s):
+        FreeCAD.Console.PrintMessage(translate("WebTools","Repository cloned in")+" "+self.repo.working_dir+"\n")
+        path = self.repo.working_dir
+        self.accept()
+        f = QtGui.QFileDialog.getOpenFileName(None,translate("WebTools","Open a file"),path,"FreeCAD (*.FCStd);;"+translate("WebTools","All files")+" (*)")
+        if isinstance(f,tuple):
+            f = f[0]
+        if f:
+            FreeCADGui.open(f)
 
 
 if FreeCAD.GuiUp:
 
     FreeCADGui.addCommand('WebTools_Git',CommandGit())
+    FreeCADGui.addCommand('WebTools_GitClone',CommandGitClone())
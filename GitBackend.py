@@ -0,0 +1,811 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2026 Yorik van Havre <yorik@uncreated.net>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+"""Generic Git helpers used by the Git task panel (doesn't depend on FreeCAD)
+
+They work on GitPython Repo objects, and try to get as much information as
+possible out of as few git processes as possible."""
+
+import os
+
+__title__ = "Git helpers"
+__author__ = "Yorik van Havre"
+__url__ = "http://www.freecadweb.org"
+
+
+MAXENTRIES = 100000 # cached tree entries of an ObjectReader
+LFSPATTERNS = ["*.FCStd", "*.fcstd", "*.step", "*.stp", "*.STEP", "*.STP",
+               "*.ifc", "*.IFC", "*.iges", "*.igs", "*.brep", "*.brp", "*.stl"]
+LFSTRANSFERS = 8 # parallel LFS uploads and downloads
+STAGECHUNK = 500 # paths per git add on git versions without --pathspec-from-file
+
+
+class FileStatus:
+
+    """The status of one file: its path, its state in the index and in the
+    working tree (one of the letters used by git status: ".", "M", "A", "D",
+    "R", "C", "T", "U", "?" or "!"), and the original path of a rename"""
+
+    __slots__ = ["path", "index", "worktree", "origPath"]
+
+    def __init__(self, path, index=".", worktree=".", origPath=None):
+
+        self.path = path
+        self.index = index
+        self.worktree = worktree
+        self.origPath = origPath
+
+    def __repr__(self):
+
+        return "<FileStatus %s%s %s>" % (self.index, self.worktree, self.path)
+
+    @property
+    def staged(self):
+
+        return self.index not in ".?!"
+
+    @property
+    def modified(self):
+
+        return self.worktree not in ".?!"
+
+    @property
+    def untracked(self):
+
+        return self.index == "?"
+
+    @property
+    def deleted(self):
+
+        return "D" in (self.index, self.worktree)
+
+    @property
+    def conflicted(self):
+
+        return "U" in (self.index, self.worktree)
+
+
+class RepoStatus:
+
+    """The status of a repository: current branch, upstream branch, number
+    of commits ahead and behind the upstream, and the list of FileStatus of
+    all the changed, staged and untracked files"""
+
+    def __init__(self):
+
+        self.oid = None # None before the first commit
+        self.branch = None # None if the HEAD is detached
+        self.upstream = None
+        self.ahead = 0
+        self.behind = 0
+        self.files = []
+
+    @property
+    def staged(self):
+
+        return [f for f in self.files if f.staged]
+
+    @property
+    def modified(self):
+
+        return [f for f in self.files if f.modified]
+
+    @property
+    def untracked(self):
+
+        return [f for f in self.files if f.untracked]
+
+
+def parseStatus(output):
+
+    """Parses the output of git status --porcelain=v2 -z --branch into
+    a RepoStatus"""
+
+    status = RepoStatus()
+    entries = output.split("\0")
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        i += 1
+        if not entry:
+            continue
+        kind = entry[0]
+        if kind == "#":
+            header = entry[2:].split(" ", 1)
+            if len(header) < 2:
+                continue
+            key, value = header
+            if key == "branch.oid":
+                if value != "(initial)":
+                    status.oid = value
+            elif key == "branch.head":
+                if value != "(detached)":
+                    status.branch = value
+            elif key == "branch.upstream":
+                status.upstream = value
+            elif key == "branch.ab":
+                ahead, behind = value.split(" ")
+                status.ahead = int(ahead)
+                status.behind = abs(int(behind))
+        elif kind == "1":
+            # 1 XY sub mH mI mW hH hI path
+            fields = entry.split(" ", 8)
+            status.files.append(FileStatus(fields[8], fields[1][0], fields[1][1]))
+        elif kind == "2":
+            # 2 XY sub mH mI mW hH hI Xscore path, followed by the original path
+            fields = entry.split(" ", 9)
+            origPath = entries[i] if i < len(entries) else None
+            i += 1
+            status.files.append(FileStatus(fields[9], fields[1][0], fields[1][1], origPath))
+        elif kind == "u":
+            # u XY sub m1 m2 m3 mW h1 h2 h3 path
+            fields = entry.split(" ", 10)
+            status.files.append(FileStatus(fields[10], fields[1][0], fields[1][1]))
+        elif kind in "?!":
+            status.files.append(FileStatus(entry[2:], kind, kind))
+    return status
+
+
+def getStatus(repo, paths=None, lock=True):
+
+    """Returns the RepoStatus of the given GitPython repo, obtained from a
+    single git process. If paths are given, only those files and
+    directories are checked. If lock is False, git doesn't update the
+    index while running, which would otherwise trigger file watchers"""
+
+    args = ["--porcelain=v2", "-z", "--branch", "--untracked-files=all"]
+    env = {}
+    if paths:
+        args += ["--"] + list(paths)
+        # file names like "[1].txt" are not patterns
+        env["GIT_LITERAL_PATHSPECS"] = "1"
+    if not lock:
+        env["GIT_OPTIONAL_LOCKS"] = "0"
+    # GitPython adds env to the current environment
+    output = repo.git.status(*args, env=env)
+    return parseStatus(output)
+
+
+def getStagePaths(files):
+
+    """Returns the paths to give to stage() to commit the given FileStatus.
+    Changes already staged, like staged deletions and renames, are left
+    out: their paths are in neither the index nor the working tree, and
+    git add would fail on them. The original path of a rename is only
+    needed when the rename happened in the working tree"""
+
+    paths = []
+    for f in files:
+        if f.worktree == ".":
+            continue
+        paths.append(f.path)
+        if f.origPath and f.worktree in "RC":
+            paths.append(f.origPath)
+    return paths
+
+
+def stage(repo, paths):
+
+    """Stages the given paths, including deleted files and both sides of
+    renames, in a single git process. Older versions of git, without
+    --pathspec-from-file, get the paths in chunks on the command line"""
+
+    paths = list(paths)
+    if not paths:
+        return
+    env = {"GIT_LITERAL_PATHSPECS": "1"}
+    if repo.git.version_info >= (2, 26):
+        import tempfile
+        # closed before running git, so git can open it on Windows too
+        with tempfile.NamedTemporaryFile("wb", suffix=".txt", delete=False) as f:
+            f.write(b"\0".join([p.encode("utf-8") for p in paths]))
+        try:
+            repo.git.add("--all", "--pathspec-from-file="+f.name, "--pathspec-file-nul", env=env)
+        finally:
+            os.remove(f.name)
+    else:
+        for i in range(0, len(paths), STAGECHUNK):
+            repo.git.add("--all", "--", *paths[i:i+STAGECHUNK], env=env)
+
+
+class StatCache:
+
+    """Remembers the size and modification time of the entries of the
+    directories of a working tree, so that when a directory changes, the
+    files that changed in it can be found without asking git"""
+
+    def __init__(self, root):
+
+        self.root = root
+        self.dirs = {} # {relative dir: {name: (is dir, size, mtime)}}
+
+    def listDirectories(self, limit=None):
+
+        """Scans the working tree breadth-first, skipping .git, and returns
+        the relative paths of up to limit directories ("" is the root)"""
+
+        result = []
+        queue = [""]
+        while queue and ((limit is None) or (len(result) < limit)):
+            d = queue.pop(0)
+            result.append(d)
+            self.scan(d)
+            for name, entry in sorted(self.dirs.get(d, {}).items()):
+                if entry[0] and (name != ".git"):
+                    queue.append(d + "/" + name if d else name)
+        return result
+
+    def listFiles(self, dirs, limit=None):
+
+        """Returns the relative paths of up to limit files of the given
+        directories, as found by their last scan"""
+
+        result = []
+        for d in dirs:
+            for name, entry in sorted(self.dirs.get(d, {}).items()):
+                if (limit is not None) and (len(result) >= limit):
+                    return result
+                if not entry[0]:
+                    result.append(d + "/" + name if d else name)
+        return result
+
+    def scan(self, d):
+
+        """Updates the snapshot of the directory d, returns the set of
+        relative paths of the entries that were added, removed or changed
+        since the previous scan"""
+
+        old = self.dirs.get(d, {})
+        new = {}
+        try:
+            with os.scandir(os.path.join(self.root, d)) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    isdir = entry.is_dir(follow_symlinks=False)
+                    new[entry.name] = (isdir, 0 if isdir else st.st_size, 0 if isdir else st.st_mtime_ns)
+        except OSError:
+            pass
+        if new:
+            self.dirs[d] = new
+        else:
+            self.dirs.pop(d, None)
+        changed = set()
+        for name in set(old) | set(new):
+            if old.get(name) != new.get(name):
+                changed.add(d + "/" + name if d else name)
+        return changed
+
+
+class Commit:
+
+    """A commit read from the object database"""
+
+    __slots__ = ["sha", "tree", "parents", "author", "authorTime", "authorOffset", "committerTime", "message"]
+
+    def __init__(self, sha):
+
+        self.sha = sha
+        self.tree = None
+        self.parents = []
+        self.author = ""
+        self.authorTime = 0
+        self.authorOffset = 0 # seconds east of UTC
+        self.committerTime = 0
+        self.message = ""
+
+    def __repr__(self):
+
+        return "<Commit %s %s>" % (self.sha[:7], self.summary)
+
+    @property
+    def summary(self):
+
+        return self.message.split("\n", 1)[0]
+
+    def getDate(self, fmt="%Y.%m.%d"):
+
+        """Returns the author date in the author's timezone"""
+
+        import time
+        return time.strftime(fmt, time.gmtime(self.authorTime + self.authorOffset))
+
+
+def parseSignature(value):
+
+    """Returns (name <email>, timestamp, offset in seconds) from the value
+    of an author or committer header"""
+
+    ident, ts, tz = value.rsplit(" ", 2)
+    offset = (int(tz[1:3])*3600 + int(tz[3:5])*60) * (-1 if tz[0] == "-" else 1)
+    return ident, int(ts), offset
+
+
+def parseCommit(sha, data):
+
+    """Parses the raw contents of a commit object into a Commit"""
+
+    commit = Commit(sha)
+    text = data.decode("utf-8", "replace")
+    header, _, commit.message = text.partition("\n\n")
+    for line in header.split("\n"):
+        if line.startswith(" "):
+            continue # continuation of a multiline header, like gpgsig
+        key, _, value = line.partition(" ")
+        if key == "tree":
+            commit.tree = value
+        elif key == "parent":
+            commit.parents.append(value)
+        elif key == "author":
+            commit.author, commit.authorTime, commit.authorOffset = parseSignature(value)
+        elif key == "committer":
+            commit.committerTime = parseSignature(value)[1]
+    return commit
+
+
+def parseTree(data):
+
+    """Yields (name, is a directory, sha) from the raw contents of a tree
+    object"""
+
+    i = 0
+    while i < len(data):
+        # <mode> <name>\0<20 bytes sha>
+        space = data.index(b" ", i)
+        nul = data.index(b"\0", space)
+        name = data[space+1:nul].decode("utf-8", "surrogateescape")
+        yield name, data[i:space] == b"40000", data[nul+1:nul+21].hex()
+        i = nul + 21
+
+
+class ObjectReader:
+
+    """Reads objects from a repository through long-lived git cat-file
+    --batch and --batch-check processes, so reading many objects doesn't
+    spawn one git process per object. The processes are started on first
+    use and stopped by close()"""
+
+    def __init__(self, repo):
+
+        self.repo = repo
+        self.processes = {}
+        self.entries = {} # {(tree sha, name): sha}
+        import threading
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    def getProcess(self, mode):
+
+        import subprocess
+        p = self.processes.get(mode)
+        if (p is None) or (p.poll() is not None):
+            git = getattr(self.repo.git, "GIT_PYTHON_GIT_EXECUTABLE", None) or "git"
+            p = subprocess.Popen([git, "cat-file", mode],
+                                 cwd=self.repo.working_dir or self.repo.git_dir,
+                                 stdin=subprocess.PIPE,
+                                 stdout=subprocess.PIPE,
+                                 creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+            self.processes[mode] = p
+        return p
+
+    def request(self, mode, rev):
+
+        """Sends a request to the given process, returns its header fields,
+        or None if the object doesn't exist"""
+
+        p = self.getProcess(mode)
+        p.stdin.write(rev.encode("utf-8") + b"\n")
+        p.stdin.flush()
+        header = p.stdout.readline().decode("utf-8").split()
+        if len(header) != 3:
+            # "<rev> missing" or "<rev> ambiguous"
+            return None
+        return header
+
+    def info(self, rev):
+
+        """Returns (sha, type, size) of the given object, or None"""
+
+        with self.lock:
+            header = self.request("--batch-check", rev)
+        if not header:
+            return None
+        return header[0], header[1], int(header[2])
+
+    def read(self, rev):
+
+        """Returns (sha, type, data) of the given object, or None"""
+
+        with self.lock:
+            header = self.request("--batch", rev)
+            if not header:
+                return None
+            size = int(header[2])
+            stdout = self.processes["--batch"].stdout
+            data = stdout.read(size)
+            stdout.read(1) # trailing newline
+        return header[0], header[1], data
+
+    def readToFile(self, rev, f, chunksize=1048576):
+
+        """Writes the contents of the given object to the file object f,
+        chunksize bytes at a time, so big objects are never fully loaded in
+        memory. Returns the type of the object, or None if it doesn't exist"""
+
+        with self.lock:
+            header = self.request("--batch", rev)
+            if not header:
+                return None
+            size = int(header[2])
+            stdout = self.processes["--batch"].stdout
+            while size > 0:
+                data = stdout.read(min(size, chunksize))
+                f.write(data)
+                size -= len(data)
+            stdout.read(1) # trailing newline
+        return header[1]
+
+    def readBlob(self, rev):
+
+        """Returns the contents of a blob, for ex. "HEAD:path/to/file", or
+        None if it doesn't exist"""
+
+        obj = self.read(rev)
+        if obj and (obj[1] == "blob"):
+            return obj[2]
+        return None
+
+    def readCommit(self, rev):
+
+        obj = self.read(rev)
+        if obj and (obj[1] == "commit"):
+            return parseCommit(obj[0], obj[2])
+        return None
+
+    def listTree(self, rev):
+
+        """Returns a list of (name, is a directory, sha) of the entries of a
+        tree, given as a sha or a revision like HEAD^{tree} or HEAD:folder"""
+
+        obj = self.read(rev)
+        if obj and (obj[1] == "tree"):
+            return list(parseTree(obj[2]))
+        return []
+
+    def readTree(self, rev):
+
+        """Returns a dictionary of {name: sha} of the entries of a tree"""
+
+        return dict([(name, sha) for name, isdir, sha in self.listTree(rev)])
+
+    def getEntry(self, tree, path):
+
+        """Returns the sha of the object at path in the given tree, or None.
+        Lookups are cached, as successive commits share most of their trees"""
+
+        sha = tree
+        for name in path.split("/"):
+            key = (sha, name)
+            if not key in self.entries:
+                if len(self.entries) > MAXENTRIES:
+                    self.entries.clear()
+                tree = self.readTree(sha)
+                for n, s in tree.items():
+                    self.entries[(sha, n)] = s
+                if not key in self.entries:
+                    self.entries[key] = None
+            sha = self.entries[key]
+            if sha is None:
+                return None
+        return sha
+
+    def walk(self, rev="HEAD", path=None):
+
+        """Yields (commit, changed) tuples for the commits reachable from
+        rev, most recent first, reading them one by one. If path is given,
+        the history is simplified like git log -- path does: at a merge
+        that has a parent with the same version of path, only the first
+        such parent is followed. changed tells if the commit changes path
+        compared to all its parents, it is always True without a path"""
+
+        import heapq
+        commit = self.readCommit(rev)
+        if not commit:
+            return
+        seen = set([commit.sha])
+        queue = [(-commit.committerTime, commit.sha, commit)]
+        while queue:
+            commit = heapq.heappop(queue)[2]
+            parents = commit.parents
+            changed = True
+            if path:
+                entry = self.getEntry(commit.tree, path)
+                if not parents:
+                    changed = entry is not None
+                else:
+                    same = [p for p in parents if self.getParentEntry(p, path) == entry]
+                    changed = not same
+                    if same:
+                        parents = same[:1]
+            yield commit, changed
+            for parent in parents:
+                if parent not in seen:
+                    seen.add(parent)
+                    parent = self.readCommit(parent)
+                    if parent:
+                        heapq.heappush(queue, (-parent.committerTime, parent.sha, parent))
+
+    def getParentEntry(self, sha, path):
+
+        """Returns the sha of the object at path in the given commit, or
+        False if the commit is missing, as in a shallow clone"""
+
+        commit = self.readCommit(sha)
+        if not commit:
+            return False
+        return self.getEntry(commit.tree, path)
+
+    def log(self, rev="HEAD", count=25, path=None):
+
+        """Yields up to count commits reachable from rev, most recent
+        first, like git log does, reading them one by one. If path is given,
+        only the commits that change that file are yielded, with the history
+        simplification of git log -- path (see walk). If count is None, the
+        whole history is walked, as the caller consumes it"""
+
+        if count is not None and count <= 0:
+            return
+        for commit, changed in self.walk(rev, path):
+            if changed:
+                yield commit
+                if count is not None:
+                    count -= 1
+                    if count <= 0:
+                        return
+
+    def close(self):
+
+        """Stops the git processes"""
+
+        with self.lock:
+            for p in self.processes.values():
+                try:
+                    p.stdin.close()
+                    p.wait(5)
+                except Exception:
+                    p.kill()
+            self.processes = {}
+
+
+def getProgressClass():
+
+    """Returns a GitPython RemoteProgress subclass that forwards the
+    progress of a fetch, pull or push to callback(operation, current,
+    maximum, message). maximum is None if unknown, message holds the
+    transferred size and rate when git reports them"""
+
+    import git
+
+    class Progress(git.RemoteProgress):
+
+        Operations = {git.RemoteProgress.COUNTING: "Counting objects",
+                      git.RemoteProgress.COMPRESSING: "Compressing objects",
+                      git.RemoteProgress.WRITING: "Writing objects",
+                      git.RemoteProgress.RECEIVING: "Receiving objects",
+                      git.RemoteProgress.RESOLVING: "Resolving deltas",
+                      git.RemoteProgress.FINDING_SOURCES: "Finding sources",
+                      git.RemoteProgress.CHECKING_OUT: "Checking out files"}
+
+        def __init__(self, callback):
+
+            git.RemoteProgress.__init__(self)
+            self.callback = callback
+
+        def update(self, op_code, cur_count, max_count=None, message=""):
+
+            operation = self.Operations.get(op_code & self.OP_MASK, "")
+            self.callback(operation, cur_count, max_count, message.strip(", "))
+
+    return Progress
+
+
+def runRemote(repo, command, remote, progress, started=None, env=None):
+
+    """Runs git fetch, pull or push (command) with the given remote,
+    reporting to progress, a RemoteProgress. started(process) is called
+    with the running git process, so it can be terminated from another
+    thread. env holds additional environment variables. Returns the
+    standard output, raises a GitCommandError carrying git's error messages
+    on failure"""
+
+    process = getattr(repo.git, command)("--progress", remote, as_process=True, universal_newlines=True, env=env or {})
+    return runProcess(process, progress, started)
+
+
+def runProcess(process, progress, started=None):
+
+    """Waits for a git process started with --progress, reporting to
+    progress, and returns its output, like runRemote"""
+
+    import git
+    from git.cmd import handle_process_output
+    if started:
+        started(process)
+    output = []
+    handle_process_output(process, output.append, progress.new_message_handler(), decode_streams=False)
+    try:
+        process.wait()
+    except git.GitCommandError as e:
+        e.stderr = "\n".join(progress.error_lines + progress.other_lines) or e.stderr
+        raise
+    return "\n".join(output + progress.other_lines)
+
+
+def clone(url, path, progress, partial=True, depth=0, started=None):
+
+    """Clones url into path without checking out any file, so the folders
+    to check out can be chosen afterwards with sparseCheckout. If partial
+    is True, file contents are only downloaded when they are checked out.
+    If depth is not 0, only that many commits of history are downloaded.
+    Returns the new GitPython Repo"""
+
+    import git
+    args = ["--progress", "--no-checkout", "--sparse"]
+    if partial:
+        args.append("--filter=blob:none")
+    if depth:
+        args.append("--depth=%i" % depth)
+    process = git.Git().clone(*(args + ["--", url, path]), as_process=True, universal_newlines=True)
+    runProcess(process, progress, started)
+    return git.Repo(path)
+
+
+def sparseCheckout(repo, folders, progress, started=None):
+
+    """Checks out only the given folders of a repo cloned by clone(), plus
+    the files at its root. In a partial clone, only the contents of these
+    files are downloaded. If folders is empty, everything is checked out"""
+
+    if folders:
+        repo.git.sparse_checkout("set", "--cone", "--", *folders)
+    else:
+        repo.git.sparse_checkout("disable")
+    branch = repo.head.reference.name if not repo.head.is_detached else "HEAD"
+    process = repo.git.checkout("--progress", branch, as_process=True, universal_newlines=True)
+    return runProcess(process, progress, started)
+
+
+def hasLFS(repo):
+
+    """Returns True if the git lfs extension is installed"""
+
+    try:
+        repo.git.lfs("version")
+    except Exception:
+        return False
+    return True
+
+
+def getLFSPatterns(repo):
+
+    """Returns the list of patterns tracked by LFS in the given repo"""
+
+    patterns = []
+    for line in repo.git.lfs("track").splitlines():
+        # "    *.FCStd (.gitattributes)"
+        line = line.strip()
+        if line.endswith(")") and (" (" in line):
+            patterns.append(line.rsplit(" (", 1)[0])
+    return patterns
+
+
+def trackLFS(repo, patterns=LFSPATTERNS, transfers=LFSTRANSFERS):
+
+    """Sets up LFS in the given repo: installs its hooks, so pushes also
+    upload LFS objects, tracks the given patterns in .gitattributes and
+    sets the number of parallel transfers"""
+
+    repo.git.lfs("install", "--local")
+    repo.git.lfs("track", *patterns)
+    repo.git.config("lfs.concurrenttransfers", str(transfers))
+
+
+def getLFSFiles(repo):
+
+    """Returns a dictionary of {path: downloaded} of the files stored in
+    LFS at HEAD. downloaded is False if the working tree only contains the
+    pointer of the file"""
+
+    files = {}
+    for line in repo.git.lfs("ls-files").splitlines():
+        # "<oid> * <path>" or "<oid> - <path>"
+        fields = line.split(" ", 2)
+        if len(fields) == 3:
+            files[fields[2]] = (fields[1] == "*")
+    return files
+
+
+def getAttribute(repo, paths, attribute):
+
+    """Returns a dictionary of {path: value} of the given attribute of the
+    given paths, which don't need to exist. value is "unspecified", "set",
+    "unset" or the value given in .gitattributes. The paths are passed to
+    a single git check-attr process through its standard input, so there
+    is no limit to their number"""
+
+    import tempfile
+    values = {}
+    paths = list(paths)
+    if not paths:
+        return values
+    with tempfile.TemporaryFile() as f:
+        f.write(b"".join([p.encode("utf-8")+b"\0" for p in paths]))
+        f.seek(0)
+        output = repo.git.check_attr("--stdin", "-z", attribute, istream=f)
+    # <path> NUL <attribute> NUL <value> NUL
+    fields = output.split("\0")
+    for i in range(0, len(fields)-2, 3):
+        values[fields[i]] = fields[i+2]
+    return values
+
+
+def getFilters(repo, patterns):
+
+    """Returns a dictionary of {pattern: filter} of the filter attribute
+    set by .gitattributes for files matching patterns like "*.FCStd".
+    The filter is "unspecified" if there is none, else for ex. lfs"""
+
+    samples = dict([("file"+p.lstrip("*"), p) for p in patterns])
+    return dict([(samples[path], value) for path, value in getAttribute(repo, samples, "filter").items()])
+
+
+def getLFSPaths(repo, paths):
+
+    """Returns the set of the given paths that are tracked by LFS, from
+    the filter attribute of .gitattributes"""
+
+    return set([p for p, value in getAttribute(repo, paths, "filter").items() if value == "lfs"])
+
+
+def pullLFS(repo, remote, started=None):
+
+    """Downloads the LFS objects of the checked out files from the given
+    remote, with parallel transfers, and updates the working tree.
+    started(process) is called like in runRemote"""
+
+    from git.cmd import handle_process_output
+    process = repo.git.lfs("pull", remote, as_process=True, universal_newlines=True)
+    if started:
+        started(process)
+    output = []
+    handle_process_output(process, output.append, output.append, decode_streams=False)
+    process.wait()
+    return "\n".join(output)
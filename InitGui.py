@@ -74,7 +74,7 @@ class WebToolsWorkbench(FreeCADGui.Workbench):
     def Initialize(self):
         # Do not remove imports
         import BIMServer, Git, Sketchfab
-        cmds = ["WebTools_Git", "WebTools_BimServer", "WebTools_Sketchfab"]  # ,"WebTools_Speckle"]
+        cmds = ["WebTools_Git", "WebTools_GitClone", "WebTools_BimServer", "WebTools_Sketchfab"]  # ,"WebTools_Speckle"]
         self.appendToolbar("Web tools", cmds)
         self.appendMenu("Web & Tools", cmds)
 
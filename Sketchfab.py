@@ -26,7 +26,7 @@ __title__ = "Sketchfab uploader"
 __author__ = "Yorik van Havre"
 __url__ = "http://www.freecadweb.org"
 
-import FreeCAD, os, zipfile, requests, tempfile, json, time, re
+import FreeCAD, os, tempfile, time
 
 if FreeCAD.GuiUp:
     import FreeCADGui
@@ -46,6 +46,58 @@ SKETCHFAB_UPLOAD_URL = "https://api.sketchfab.com/v3/models"
 SKETCHFAB_TOKEN_URL = "https://sketchfab.com/settings/password"
 SKETCHFAB_MODEL_URL = "https://sketchfab.com/show/"
 
+# meshes of the exported objects of each open document, kept between
+# uploads so only the objects that changed since the last one are
+# tessellated again
+MESHCACHES = {}
+MESHCACHEOBSERVER = None
+
+
+class MeshCacheObserver:
+
+    """drops the mesh cache of a document when it is closed"""
+
+    def slotDeletedDocument(self,doc):
+
+        MESHCACHES.pop(doc.Name,None)
+
+
+def getMeshes(objects):
+
+    """returns a (label, vertices, triangles) mesh for each object,
+    tessellating only the shapes that changed since the last export, or
+    None if numpy is not installed or if an object has no shape, in which
+    case the objects must be exported with Mesh.export"""
+
+    global MESHCACHEOBSERVER
+    try:
+        # the cached meshes are numpy arrays
+        import numpy
+    except ImportError:
+        return None
+    import hashlib, Part, SketchfabClient
+    if MESHCACHEOBSERVER is None:
+        MESHCACHEOBSERVER = MeshCacheObserver()
+        FreeCAD.addDocumentObserver(MESHCACHEOBSERVER)
+    tolerance = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Mesh").GetFloat("MaxDeviationExport",0.1)
+    tessellated = 0
+    meshes = []
+    for obj in objects:
+        # resolves links and containers, with their global placement
+        shape = Part.getShape(obj,"",transform=True)
+        if shape.isNull():
+            FreeCAD.Console.PrintLog("Sketchfab: %s has no shape, using the mesh exporter\n" % obj.Label)
+            return None
+        cache = MESHCACHES.setdefault(obj.Document.Name,SketchfabClient.MeshCache())
+        misses = cache.misses
+        # the shape is keyed on its contents, including its placement
+        key = (hashlib.sha1(shape.exportBrepToString().encode("utf-8")).hexdigest(),tolerance)
+        vertices,triangles = cache.get(obj.Name,key,lambda: shape.tessellate(tolerance))
+        tessellated += cache.misses-misses
+        meshes.append((obj.Label,vertices,triangles))
+    FreeCAD.Console.PrintLog("Sketchfab: tessellated %i of %i objects\n" % (tessellated,len(meshes)))
+    return meshes
+
 
 class CommandSketchfab:
 
@@ -77,6 +129,9 @@ class CommandSketchfab:
 class SketchfabTaskPanel:
 
     """The TaskPanel for Sketchfab upload"""
+
+    MaxPollErrors = 10 # failed status checks before giving up
+    PollTimeout = 900 # seconds to wait for Sketchfab to process a model
     
     def __init__(self):
         
@@ -84,6 +139,7 @@ class SketchfabTaskPanel:
         self.form = FreeCADGui.PySideUic.loadUi(os.path.join(os.path.dirname(__file__),"ui","TaskSketchfab.ui"))
         self.form.setWindowIcon(QtGui.QIcon(os.path.join(os.path.dirname(__file__), "icons", "sketchfab.svg")))
         self.form.ProgressBar.hide()
+        self.form.Button_Cancel.hide()
         self.form.Button_View.hide()
         self.form.fixLabel.hide()
         self.form.fixButton.hide()
@@ -91,6 +147,14 @@ class SketchfabTaskPanel:
         QtCore.QObject.connect(self.form.Button_Upload,QtCore.SIGNAL("pressed()"),self.upload)
         QtCore.QObject.connect(self.form.Button_View,QtCore.SIGNAL("pressed()"),self.viewModel)
         QtCore.QObject.connect(self.form.fixButton,QtCore.SIGNAL("pressed()"),self.fix)
+        QtCore.QObject.connect(self.form.Button_Cancel,QtCore.SIGNAL("pressed()"),self.cancel)
+        from WebToolsUtils import Worker
+        self.Worker = Worker()
+        self.client = None
+        self.Polling = False
+        self.PollTimer = QtCore.QTimer()
+        self.PollTimer.setSingleShot(True)
+        QtCore.QObject.connect(self.PollTimer,QtCore.SIGNAL("timeout()"),self.poll)
         self.form.Text_Name.setText(FreeCAD.ActiveDocument.Label)
         self.form.Text_Token.setText(FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Web").GetString("SketchfabToken",""))
 
@@ -108,6 +172,8 @@ class SketchfabTaskPanel:
 
     def accept(self):
         
+        self.cancel()
+        self.Worker.cancel()
         FreeCADGui.ActiveDocument.resetEdit()
         return True
 
@@ -115,16 +181,6 @@ class SketchfabTaskPanel:
         
         QtGui.QDesktopServices.openUrl(SKETCHFAB_TOKEN_URL)
         
-    def get_request_payload(self, token, data={}, files={}, json_payload=False):
-        
-        """Helper method that returns the authentication token and proper content
-        type depending on whether or not we use JSON payload."""
-        headers = {'Authorization': 'Token {}'.format(token)}
-        if json_payload:
-            headers.update({'Content-Type': 'application/json'})
-            data = json.dumps(data)
-        return {'data': data, 'files': files, 'headers': headers}
-        
     def saveFile(self):
         
         import FreeCADGui
@@ -143,16 +199,26 @@ class SketchfabTaskPanel:
             importOBJ.export(objects,filename+".obj")
             return self.packFiles(filename,[filename+".obj",filename+".mtl"])
         elif filetype == 1: # OBJ (mesh exporter)
-            import Mesh
-            Mesh.export(objects,filename+".obj")
+            meshes = getMeshes(objects)
+            if meshes is None:
+                import Mesh
+                Mesh.export(objects,filename+".obj")
+            else:
+                import SketchfabClient
+                SketchfabClient.writeOBJ(filename+".obj",meshes)
             return self.packFiles(filename,[filename+".obj"])
         elif filetype == 2: # DAE
             import importDAE
             importDAE.export(objects,filename+".dae")
             return self.packFiles(filename,[filename+".dae"])
         elif filetype == 3: # STL
-            import Mesh
-            Mesh.export(objects,filename+".stl")
+            meshes = getMeshes(objects)
+            if meshes is None:
+                import Mesh
+                Mesh.export(objects,filename+".stl")
+            else:
+                import SketchfabClient
+                SketchfabClient.writeSTL(filename+".stl",meshes)
             return self.packFiles(filename,[filename+".stl"])
         elif filetype == 4: # IGES
             import Part
@@ -166,50 +232,36 @@ class SketchfabTaskPanel:
                 if o.isDerivedFrom("Part::Feature"):
                     if o.Shape.Faces:
                         nobjects.append(o)
-            FreeCADGui.export(nobjects,filename+".iv")
+            FreeCADGui.export(nobjects,filename+".freecad.iv")
             # removing FreeCAD-specific nodes
-            f = open(filename+".iv","rb")
-            s = f.read()
-            f.close()
+            import SketchfabClient
             ver = FreeCAD.Version()
             vinfo = "# Exported by FreeCAD v" + ver[0] + "." + ver[1] + " build" + ver[2] + "\n"
-            vinfo += "# http://www.freecadweb.org\n"
-            s = s.replace("#Inventor V2.1 ascii","#Inventor V2.1 ascii\n"+vinfo)
-            s = s.replace("SoBrepEdgeSet","IndexedLineSet")
-            s = s.replace("SoBrepFaceSet","IndexedFaceSet")
-            s = s.replace("SoBrepPointSet","IndexedPointSet")
-            s = s.replace("\n","--endl--")
-            s = re.sub(r"--endl--[ \t]+highlightIndex.*?--endl--","--endl--",s)
-            s = re.sub(r"--endl--[ \t]+partIndex.*?--endl--","--endl--",s)
-            s = re.sub(r"--endl--[ \t]+selectionIndex.*?--endl--","--endl--",s)
-            s = re.sub(r"SFInt32 highlightIndex, ","",s)
-            s = re.sub(r"MFInt32 partIndex, ","",s)
-            s = re.sub(r"MFInt32 selectionIndex ","",s)
-            s = re.sub(r", \]"," \]",s)
-            s = s.replace("--endl--","\n")
-            f = open(filename+".iv","wb")
-            f.write(s)
-            f.close()
+            vinfo += "# http://www.freecadweb.org\n\n"
+            SketchfabClient.cleanInventor(filename+".freecad.iv",filename+".iv",vinfo.encode("utf-8"))
+            os.remove(filename+".freecad.iv")
             print("saved "+filename+".iv")
             return self.packFiles(filename,[filename+".iv"])
 
     def packFiles(self,filename,fileslist):
         
+        """packs the exported files in a zip kept in memory if small enough,
+        returns (file object, zip filename, human-readable size, size)"""
+        import SketchfabClient
         for f in fileslist:
             if not os.path.exists(f):
                 return None
-        z = zipfile.ZipFile(filename+".zip","w")
-        for f in fileslist:
-            z.write(f,os.path.basename(f))
-        z.close()
+        z = SketchfabClient.pack(fileslist)
         for f in fileslist:
             os.remove(f)
-        s = os.path.getsize(filename+".zip")
+        z.seek(0,os.SEEK_END)
+        s = z.tell()
+        z.seek(0)
         if s > 1048576:
             size = str(s >> 20)+" MB"
         else:
             size = str(s >> 10)+" KB"
-        return (filename+".zip",size)
+        return (z,os.path.basename(filename)+".zip",size,s)
 
     def upload(self):
 
@@ -228,124 +280,158 @@ class SketchfabTaskPanel:
             return
             
         # preparing model data
-        if os.path.getsize(pack[0]) >= 52428800:
+        if pack[3] >= 52428800:
             b = QtGui.QMessageBox()
             b.setText(translate("WebTools","Big upload"))
-            b.setInformativeText(translate("WebTools","The file to be uploaded is %s, which is above the maximum 50Mb allowed by free Sketchfab accounts. Pro accounts allow for up to 200Mb. Continue?") % pack[1])
+            b.setInformativeText(translate("WebTools","The file to be uploaded is %s, which is above the maximum 50Mb allowed by free Sketchfab accounts. Pro accounts allow for up to 200Mb. Continue?") % pack[2])
             b.setStandardButtons(QtGui.QMessageBox.Ok | QtGui.QMessageBox.Cancel)
             b.setDefaultButton(QtGui.QMessageBox.Cancel)
             ret = b.exec_()
             if ret != QtGui.QMessageBox.Ok:
+                pack[0].close()
                 return            
-        data = {
-            "name": self.form.Text_Name.text(),
-            "description": self.form.Text_Description.text(),
-            "tags": ["freecad"]+[t.strip() for t in self.form.Text_Tags.text().split(",")],
-            "private": self.form.Check_Private.isChecked(),
-            "source":"freecad",
-            }
-        files = {
-            "modelFile": open(pack[0], 'rb')
-            }
+        import SketchfabClient
+        self.client = SketchfabClient.SketchfabClient(self.form.Text_Token.text(),SKETCHFAB_UPLOAD_URL)
+        name = self.form.Text_Name.text()
+        description = self.form.Text_Description.text()
+        tags = ["freecad"]+[t.strip() for t in self.form.Text_Tags.text().split(",")]
+        private = self.form.Check_Private.isChecked()
             
-        # performing upload
+        # performing upload in the background, the zip is streamed from memory or disk
         self.form.Button_Upload.hide()
-        # for now this is a fake progress bar, it won't move, just to show the user that the upload is in progress
-        self.form.ProgressBar.setFormat(translate("WebTools","Uploading")+" "+pack[1]+"...")
+        self.form.ProgressBar.setMaximum(max(pack[3] >> 10,1))
+        self.form.ProgressBar.setValue(0)
+        self.form.ProgressBar.setFormat(translate("WebTools","Uploading")+" "+pack[2]+"... %p%")
         self.form.ProgressBar.show()
-        QtGui.QApplication.instance().processEvents()
-        try:
-            r = requests.post(SKETCHFAB_UPLOAD_URL, **self.get_request_payload(self.form.Text_Token.text(), data, files=files))
-        except requests.exceptions.RequestException as e:
-            QtGui.QMessageBox.critical(None,translate("WebTools","Upload error"),translate("WebTools","Upload failed:")+" "+str(e))
+        self.form.Button_Cancel.show()
+        def upload():
+            return self.client.upload(pack[0],name,description,tags,private,progress=self.setProgress,filename=pack[1])
+        def onUploaded(url):
+            pack[0].close()
+            self.url = url
+            self.form.Button_View.show()
             self.form.ProgressBar.hide()
-            self.form.Button_Upload.show()
-            return
-        if r.status_code != requests.codes.created:
-            QtGui.QMessageBox.critical(None,translate("WebTools","Upload error"),translate("WebTools","Upload failed:")+" "+str(r.json()))
+            self.form.Button_Cancel.hide()
+            # patching model once Sketchfab has processed it
+            if self.form.Combo_Filetype.currentIndex() in [0,1,5]: # OBJ and IV formats: sketchfab expects inverted Y/Z axes
+                self.fix()
+        def onError(e):
+            from tools import multipart
+            pack[0].close()
             self.form.ProgressBar.hide()
+            self.form.Button_Cancel.hide()
             self.form.Button_Upload.show()
-            return
-        self.url = r.headers['Location']
-        
-        # patching model
-        if self.form.Combo_Filetype.currentIndex() in [0,1,5]: # OBJ and IV formats: sketchfab expects inverted Y/Z axes
+            if isinstance(e,multipart.Cancelled):
+                FreeCAD.Console.PrintWarning(translate("WebTools","Upload cancelled")+"\n")
+            else:
+                QtGui.QMessageBox.critical(None,translate("WebTools","Upload error"),translate("WebTools","Upload failed:")+" "+str(e))
+        self.Worker.run(upload,onUploaded,onError)
+
+    def setProgress(self,done,total):
+
+        "reports the progress of the upload, from the worker thread"
+        self.Worker.post(self.showProgress,(done,total))
+
+    def showProgress(self,progress):
+
+        # the total is the whole multipart body, not only the file
+        done,total = progress
+        self.form.ProgressBar.setMaximum(max(total >> 10,1))
+        self.form.ProgressBar.setValue(done >> 10)
+
+    def cancel(self):
+
+        if self.Polling:
+            # cancelling the orientation fix, a pending result is ignored
+            self.stopPolling()
             self.form.fixLabel.show()
             self.form.fixButton.show()
-        self.form.ProgressBar.hide()
-        self.form.Button_View.show()
+        elif self.client:
+            self.client.cancel()
         
     def fix(self):
-        
-        self.form.ProgressBar.show()
+
+        "waits for Sketchfab to process the uploaded model, then fixes its orientation"
+        self.form.fixButton.hide()
+        self.form.ProgressBar.setMaximum(0)
         self.form.ProgressBar.setFormat(translate("WebTools","Awaiting confirmation..."))
-        self.form.ProgressBar.setValue(75)
-        if self.poll(self.url):
-            self.form.ProgressBar.setFormat(translate("WebTools","Fixing model..."))
-            QtGui.QApplication.instance().processEvents()
-            self.patch(self.url)
+        self.form.ProgressBar.show()
+        self.form.Button_Cancel.show()
+        self.PollAttempt = 0
+        self.PollErrors = 0
+        self.PollStart = time.time()
+        self.Polling = True
+        self.poll()
+
+    def poll(self):
+
+        "checks the processing status of the uploaded model in the background"
+        url = self.url
+        self.Worker.run(lambda: self.client.getStatus(url),self.onStatus,self.onPollError)
+
+    def onStatus(self,result):
+
+        if not self.Polling:
+            return
+        status,retryAfter = result
+        if status == "SUCCEEDED":
+            self.patch()
+        elif status == "FAILED":
+            self.onFixFailed(translate("WebTools","Sketchfab could not process the model"))
         else:
-            QtGui.QMessageBox.warning(None,translate("WebTools","Patch error"),translate("WebTools","Patching failed. The model was successfully uploaded, but might still require manual adjustments."))
-        self.form.ProgressBar.hide()
-        
-    def poll(self,url):
-        
-        """GET the model endpoint to check the processing status."""
-        max_errors = 10
-        errors = 0
-        retry = 0
-        max_retries = 50
-        retry_timeout = 5  # seconds
-        while (retry < max_retries) and (errors < max_errors):
-            try:
-                r = requests.get(url, **self.get_request_payload(self.form.Text_Token.text()))
-            except requests.exceptions.RequestException as e:
-                print ('Sketchfab: Polling failed with error: ',str(e))
-                errors += 1
-                retry += 1
-                continue
-            result = r.json()
-            if "error" in result:
-                e = result["error"]
-            else:
-                e = result
-            if r.status_code != requests.codes.ok:
-                print ('Sketchfab: Polling failed with error: ',str(e))
-                errors += 1
-                retry += 1
-                continue
-            processing_status = result['status']['processing']
-            if processing_status == 'PENDING':
-                retry += 1
-                time.sleep(retry_timeout)
-                continue
-            elif processing_status == 'PROCESSING':
-                retry += 1
-                time.sleep(retry_timeout)
-                continue
-            elif processing_status == 'FAILED':
-                print ('Sketchfab: Polling failed: ',str(e))
-                return False
-            elif processing_status == 'SUCCEEDED':
-                return True
-            retry += 1
-        print ('Sketchfab: Stopped polling after too many retries or too many errors')
-        return False
-        
-    def patch(self,url):
-        
-        "applies different fixes to the uploaded model"
-        options_url = os.path.join(url, 'options')
-        data = {
-            'orientation': '{"axis": [1, 0, 0], "angle": 270}'
-            }
-        try:
-            r = requests.patch(options_url, **self.get_request_payload(self.form.Text_Token.text(), data, json_payload=True))
-        except requests.exceptions.RequestException as e:
-            QtGui.QMessageBox.warning(None,translate("WebTools","Patch error"),translate("WebTools","Patching failed. The model was successfully uploaded, but might still require manual adjustments:")+" "+str(e))
+            # PENDING, PROCESSING, or the server is busy
+            self.pollLater(retryAfter)
+
+    def onPollError(self,e):
+
+        if not self.Polling:
+            return
+        FreeCAD.Console.PrintWarning(translate("WebTools","Sketchfab: Polling failed with error:")+" "+str(e)+"\n")
+        self.PollErrors += 1
+        if self.PollErrors >= self.MaxPollErrors:
+            self.onFixFailed(str(e))
         else:
-            if r.status_code != 204:
-                QtGui.QMessageBox.warning(None,translate("WebTools","Patch error"),translate("WebTools","Patching failed. The model was successfully uploaded, but might still require manual adjustments:")+" "+str(r.content))
+            self.pollLater()
+
+    def pollLater(self,retryAfter=None):
+
+        "schedules the next status check, backing off each time"
+        import SketchfabClient
+        delay = SketchfabClient.getDelay(self.PollAttempt,retryAfter)
+        self.PollAttempt += 1
+        if time.time() + delay - self.PollStart > self.PollTimeout:
+            self.onFixFailed(translate("WebTools","Stopped polling after too many retries"))
+            return
+        self.PollTimer.start(int(delay*1000))
+
+    def patch(self):
+
+        "applies different fixes to the uploaded model"
+        self.form.ProgressBar.setFormat(translate("WebTools","Fixing model..."))
+        url = self.url
+        self.Worker.run(lambda: self.client.setOrientation(url),self.onPatched,self.onFixFailed)
+
+    def onPatched(self,result):
+
+        if self.Polling:
+            self.stopPolling()
+            self.form.fixLabel.hide()
+
+    def onFixFailed(self,e):
+
+        if not self.Polling:
+            return
+        self.stopPolling()
+        self.form.fixLabel.show()
+        self.form.fixButton.show()
+        QtGui.QMessageBox.warning(None,translate("WebTools","Patch error"),translate("WebTools","Patching failed. The model was successfully uploaded, but might still require manual adjustments:")+" "+str(e))
+
+    def stopPolling(self):
+
+        self.Polling = False
+        self.PollTimer.stop()
+        self.form.ProgressBar.hide()
+        self.form.Button_Cancel.hide()
 
     def viewModel(self):
         
@@ -0,0 +1,392 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2026 Yorik van Havre <yorik@uncreated.net>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+"""Generic Sketchfab interface (doesn't depend on FreeCAD)
+
+This module talks to the Sketchfab v3 API. It is used by the Sketchfab
+task panel, but can also be used from scripts:
+
+    import SketchfabClient
+    client = SketchfabClient.SketchfabClient(token)
+    url = client.upload("model.zip", "My model")
+    attempt = 0
+    while client.getStatus(url)[0] not in ("SUCCEEDED", "FAILED"):
+        time.sleep(SketchfabClient.getDelay(attempt))
+        attempt += 1
+    client.setOrientation(url)
+"""
+
+import os, re, struct, zipfile, tempfile, random, collections
+
+__title__ = "Sketchfab API client"
+__author__ = "Yorik van Havre"
+__url__ = "http://www.freecadweb.org"
+
+
+UPLOAD_URL = "https://api.sketchfab.com/v3/models"
+DEFAULT_TIMEOUT = (10, 300) # connect, read (seconds)
+CHUNKSIZE = 1048576 # bytes between two progress reports
+SPOOLSIZE = 67108864 # bytes of a packed model kept in memory before spilling to disk
+
+# deflate level of each exported format, 0 is stored. Text formats shrink
+# to about 45% at level 1, higher levels gain a few percent for several
+# times the time. Binary STL barely shrinks and is stored as is
+COMPRESSION = {".obj": 1, ".mtl": 1, ".dae": 1, ".iges": 1, ".igs": 1, ".iv": 1, ".stl": 0}
+DEFAULT_COMPRESSION = 1
+
+POLL_DELAY = 2 # seconds before the first processing status check, doubled each time
+POLL_MAXDELAY = 60 # seconds between two status checks at most
+
+# statuses for which the request should simply be retried later
+RETRY_STATUSES = (429, 502, 503, 504)
+
+DEFAULT_CACHESIZE = 536870912 # bytes of vertices and triangles kept by a MeshCache
+OBJ_ROWS = 65536 # vertices or triangles formatted at once when writing OBJ files
+
+# FreeCAD writes its shapes in Open Inventor files as SoBrep nodes, with
+# selection fields other readers don't know. IV_PATTERN finds, in one
+# pass, the node names, the fields declarations of these nodes, and the
+# lines setting the selection fields with their possibly multiline lists.
+# The indentation is matched through a lookahead and a backreference so it
+# isn't backtracked on every line of coordinates
+IV_RENAMES = {b"SoBrepEdgeSet": b"IndexedLineSet",
+              b"SoBrepFaceSet": b"IndexedFaceSet",
+              b"SoBrepPointSet": b"IndexedPointSet"}
+IV_FIELDS = (b"partIndex", b"highlightIndex", b"selectionIndex")
+IV_PATTERN = re.compile(br"SoBrep(?:Edge|Face|Point)Set"
+                        br"|fields \[[^\]\n]*\]"
+                        br"|\n(?=([ \t]+))\1(?:partIndex|highlightIndex|selectionIndex)\b[^\n\[]*(?:\[[^\]]*\][^\n]*)?")
+IV_LIST = re.compile(br"[ \t]*\[")
+
+
+class SketchfabError(Exception):
+
+    """Raised when Sketchfab refuses a request"""
+
+
+def pack(paths, spoolsize=SPOOLSIZE):
+
+    """Packs the given files in a zip file, each with the compression
+    level of its format, and returns it as a file object rewound to its
+    start. The zip is kept in memory unless it becomes bigger than
+    spoolsize, then it is moved to a temporary file"""
+
+    f = tempfile.SpooledTemporaryFile(spoolsize)
+    with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as z:
+        for path in paths:
+            level = COMPRESSION.get(os.path.splitext(path)[1].lower(), DEFAULT_COMPRESSION)
+            if level:
+                z.write(path, os.path.basename(path), zipfile.ZIP_DEFLATED, level)
+            else:
+                z.write(path, os.path.basename(path), zipfile.ZIP_STORED)
+    f.seek(0)
+    return f
+
+
+def replaceIV(match):
+
+    s = match.group(0)
+    if s[:1] == b"\n":
+        # a selection field
+        return b""
+    if s[:1] == b"S":
+        return IV_RENAMES[s]
+    fields = [f.strip() for f in s[8:-1].split(b",")]
+    fields = [f for f in fields if f and f.split()[-1] not in IV_FIELDS]
+    return b"fields [ " + b", ".join(fields) + (b" ]" if fields else b"]")
+
+
+def isInIVList(chunk):
+
+    """True if chunk ends inside the list of a selection field, which
+    must not be split between two chunks"""
+
+    for field in IV_FIELDS:
+        i = chunk.rfind(field)
+        if i >= 0:
+            m = IV_LIST.match(chunk, i + len(field))
+            if m and chunk.find(b"]", m.end()) < 0:
+                return True
+    return False
+
+
+def cleanInventor(src, dst, header=b"", chunksize=CHUNKSIZE):
+
+    """Rewrites an Open Inventor file exported by FreeCAD so other readers
+    can open it: SoBrep nodes become standard indexed sets and their
+    selection fields are removed. The given header lines are inserted
+    after the first line. The file is read in chunks of whole lines of
+    about chunksize bytes, each rewritten with a single regex pass, so
+    memory use doesn't depend on the file size"""
+
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        first = fin.readline()
+        fout.write(first)
+        if first.startswith(b"#Inventor"):
+            fout.write(header)
+        # the newline ending a chunk is kept for the next one, since
+        # selection field lines are matched with their preceding newline
+        pending = b""
+        while True:
+            chunk = fin.read(chunksize)
+            if not chunk:
+                break
+            chunk = b"".join((pending, chunk, fin.readline()))
+            while isInIVList(chunk):
+                line = fin.readline()
+                if not line:
+                    break
+                chunk += line
+            if chunk.endswith(b"\n"):
+                chunk, pending = chunk[:-1], b"\n"
+            else:
+                pending = b""
+            fout.write(IV_PATTERN.sub(replaceIV, chunk))
+        fout.write(pending)
+
+
+class MeshCache:
+
+    """Meshes of exported objects, kept between exports as numpy arrays of
+    float32 vertices and int32 triangles. Each mesh is stored under the
+    name of its object with a key that must change when the mesh has to be
+    rebuilt, for example a hash of the contents of the shape and the
+    tessellation tolerance. When the cache grows above maxsize bytes, the
+    least recently used meshes are dropped"""
+
+    def __init__(self, maxsize=DEFAULT_CACHESIZE):
+
+        self.maxsize = maxsize
+        self.meshes = collections.OrderedDict() # name: (key, vertices, triangles)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, key, build):
+
+        """Returns the (vertices, triangles) arrays of the named mesh.
+        build() is only called if the cache has no mesh of this name with
+        this key, it returns sequences of (x, y, z) vertices and of (i, j,
+        k) triangles"""
+
+        import numpy
+        entry = self.meshes.pop(name, None)
+        if entry and entry[0] == key:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if entry:
+                self.size -= entry[1].nbytes + entry[2].nbytes
+            vertices, triangles = build()
+            vertices = numpy.asarray(vertices, dtype=numpy.float32).reshape(-1, 3)
+            triangles = numpy.asarray(triangles, dtype=numpy.int32).reshape(-1, 3)
+            entry = (key, vertices, triangles)
+            self.size += vertices.nbytes + triangles.nbytes
+        self.meshes[name] = entry
+        while self.size > self.maxsize and len(self.meshes) > 1:
+            key, vertices, triangles = self.meshes.popitem(last=False)[1]
+            self.size -= vertices.nbytes + triangles.nbytes
+        return entry[1], entry[2]
+
+    def clear(self):
+
+        self.meshes.clear()
+        self.size = 0
+
+
+def writeOBJ(path, meshes, rows=OBJ_ROWS):
+
+    """Writes a list of (name, vertices, triangles) meshes, as returned by
+    MeshCache, to an OBJ file with one object per mesh"""
+
+    with open(path, "w", encoding="utf-8") as f:
+        offset = 1
+        for name, vertices, triangles in meshes:
+            f.write("o %s\n" % " ".join(name.split()))
+            for i in range(0, len(vertices), rows):
+                block = vertices[i:i + rows]
+                f.write(("v %.6f %.6f %.6f\n" * len(block)) % tuple(block.ravel().tolist()))
+            for i in range(0, len(triangles), rows):
+                block = triangles[i:i + rows] + offset
+                f.write(("f %i %i %i\n" * len(block)) % tuple(block.ravel().tolist()))
+            offset += len(vertices)
+
+
+def writeSTL(path, meshes):
+
+    """Writes a list of (name, vertices, triangles) meshes, as returned by
+    MeshCache, to a binary STL file"""
+
+    import numpy
+    facet = numpy.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+    with open(path, "wb") as f:
+        f.write(b"Exported by FreeCAD".ljust(80, b" "))
+        f.write(struct.pack("<I", sum([len(m[2]) for m in meshes])))
+        for name, vertices, triangles in meshes:
+            corners = vertices[triangles]
+            normals = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+            lengths = numpy.sqrt((normals * normals).sum(axis=1))
+            lengths[lengths == 0] = 1
+            data = numpy.zeros(len(triangles), facet)
+            data["normal"] = normals / lengths[:, None]
+            data["vertices"] = corners
+            f.write(data.tobytes())
+
+
+def getDelay(attempt, retryAfter=None, delay=POLL_DELAY, maxdelay=POLL_MAXDELAY):
+
+    """Returns the number of seconds to wait before the given retry
+    (starting at 0): an exponential backoff capped at maxdelay, of which
+    the second half is random so several clients don't poll in step. A
+    Retry-After delay sent by the server is always honored"""
+
+    d = min(maxdelay, delay * 2 ** attempt)
+    d = d / 2 + random.uniform(0, d / 2)
+    if retryAfter is not None:
+        d = max(d, retryAfter)
+    return d
+
+
+def parseRetryAfter(value):
+
+    """Returns the number of seconds of a Retry-After header, given either
+    as seconds or as an HTTP date, or None"""
+
+    if not value:
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    import email.utils, time
+    try:
+        date = email.utils.parsedate_tz(value)
+    except (TypeError, ValueError):
+        return None
+    if not date:
+        return None
+    return max(0, email.utils.mktime_tz(date) - time.time())
+
+
+class SketchfabClient:
+
+    """A connection to the Sketchfab API with the given user token. url is
+    the models endpoint, which can be changed to test against another
+    server"""
+
+    def __init__(self, token, url=UPLOAD_URL, timeout=DEFAULT_TIMEOUT):
+
+        import requests
+        self.token = token
+        self.url = url
+        self.timeout = timeout
+        self.stream = None
+        self.cancelled = False
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": "Token " + token})
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    def close(self):
+
+        self.session.close()
+
+    def getError(self, resp):
+
+        try:
+            return str(resp.json())
+        except ValueError:
+            return "HTTP %i %s" % (resp.status_code, resp.reason)
+
+    def upload(self, model, name, description="", tags=(), private=False, source="freecad", progress=None, chunksize=CHUNKSIZE, filename=None):
+
+        """Uploads a model file, given as a path or as a binary file object
+        with the given filename, and returns the API url of the new model.
+        The file is streamed as a multipart body, so memory use doesn't
+        depend on its size. If given, progress(done, total) is
+        called every chunksize bytes. The upload can be stopped from another
+        thread with cancel(), it then raises tools.multipart.Cancelled"""
+
+        from tools import multipart
+        fields = [("name", name),
+                  ("description", description),
+                  ("private", private),
+                  ("source", source)]
+        fields += [("tags", t) for t in tags if t]
+        files = [("modelFile", filename or os.path.basename(model), model)]
+        self.stream = multipart.MultipartStream(fields, files, progress, chunksize)
+        if self.cancelled:
+            self.stream.cancel()
+        try:
+            resp = self.session.post(self.url, data=self.stream, headers={"Content-Type": self.stream.contentType}, timeout=self.timeout)
+        except Exception:
+            if self.stream.cancelled:
+                raise multipart.Cancelled("Upload cancelled")
+            raise
+        finally:
+            self.stream.close()
+        if resp.status_code != 201:
+            raise SketchfabError(self.getError(resp))
+        return resp.headers["Location"]
+
+    def getStatus(self, url):
+
+        """Returns the processing status of an uploaded model, one of
+        PENDING, PROCESSING, SUCCEEDED or FAILED, and the Retry-After delay
+        sent by the server or None. When the server is busy, the status is
+        None and the request should be retried later"""
+
+        resp = self.session.get(url, timeout=self.timeout)
+        retryAfter = parseRetryAfter(resp.headers.get("Retry-After"))
+        if resp.status_code in RETRY_STATUSES:
+            return None, retryAfter
+        if resp.status_code != 200:
+            raise SketchfabError(self.getError(resp))
+        try:
+            return resp.json()["status"]["processing"], retryAfter
+        except (ValueError, KeyError, TypeError):
+            raise SketchfabError(self.getError(resp))
+
+    def setOrientation(self, url, axis=(1, 0, 0), angle=270):
+
+        """Rotates an uploaded model by angle degrees around axis. The
+        default turns the Y up models of OBJ and IV files to Z up"""
+
+        import json
+        data = {"orientation": json.dumps({"axis": list(axis), "angle": angle})}
+        resp = self.session.patch(url.rstrip("/") + "/options", json=data, timeout=self.timeout)
+        if resp.status_code != 204:
+            raise SketchfabError(self.getError(resp))
+
+    def cancel(self):
+
+        """Stops the current upload, can be called from any thread"""
+
+        self.cancelled = True
+        if self.stream:
+            self.stream.cancel()
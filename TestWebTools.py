@@ -5,3 +5,7 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
 # from tests.test_mixed_curve_freecad import TestMixedCurveWithFreeCAD
+
+from tests.test_bimserverclient import TestRetry, TestCheckin, TestRevisions
+from tests.test_gitbackend import TestStage, TestLog, TestStatCache, TestLFS
+from tests.test_sketchfabclient import TestUpload, TestStatus
@@ -0,0 +1,73 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2026 Yorik van Havre <yorik@uncreated.net>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+"""Utilities shared by the WebTools task panels"""
+
+from PySide import QtCore
+
+__title__ = "WebTools utilities"
+__author__ = "Yorik van Havre"
+__url__ = "http://www.freecadweb.org"
+
+
+class Worker(QtCore.QObject):
+
+    '''Runs functions one after the other in a background thread, and
+    calls back with their results on the GUI thread, through a Qt signal'''
+
+    posted = QtCore.Signal(object,object)
+
+    def __init__(self):
+        QtCore.QObject.__init__(self)
+        from concurrent.futures import ThreadPoolExecutor
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.cancelled = False
+        self.posted.connect(self.onPosted)
+
+    def run(self,func,callback=None,errback=None):
+        "runs func() in the background, then callback(result) or errback(exception) on the GUI thread"
+        def job():
+            if self.cancelled:
+                return
+            try:
+                result = func()
+            except Exception as e:
+                if errback:
+                    self.post(errback,e)
+            else:
+                if callback:
+                    self.post(callback,result)
+        self.pool.submit(job)
+
+    def post(self,func,value):
+        "calls func(value) on the GUI thread, can be called from any thread"
+        if not self.cancelled:
+            self.posted.emit(func,value)
+
+    def onPosted(self,func,value):
+        if not self.cancelled:
+            func(value)
+
+    def cancel(self):
+        "drops all pending functions and results"
+        self.cancelled = True
+        self.pool.shutdown(wait=False,cancel_futures=True)
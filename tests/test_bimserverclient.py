@@ -0,0 +1,144 @@
+"""Tests of BIMServerClient against a local HTTP server standing in for BimServer"""
+
+import os, json, time, base64, shutil, tempfile, threading, unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+import BIMServerClient
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    """Answers the JSON calls with server.answer(request), which returns
+    a status code and a JSON result, and records the called methods"""
+
+    def do_POST(self):
+
+        data = self.rfile.read(int(self.headers["Content-Length"]))
+        request = json.loads(data.decode("utf-8"))["request"]
+        self.server.calls.append(request)
+        time.sleep(self.server.delay)
+        status, result = self.server.answer(request)
+        body = json.dumps({"response": {"result": result}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+
+        pass
+
+
+class ServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.server = HTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.server.calls = []
+        self.server.answer = lambda request: (200, None)
+        self.server.delay = 0
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.tmp = tempfile.mkdtemp()
+        url = "http://127.0.0.1:%i" % self.server.server_address[1]
+        self.client = BIMServerClient.BimServerClient(url, token="token", retries=2, backoff=0)
+
+    def tearDown(self):
+
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def methods(self):
+
+        return [c["method"] for c in self.server.calls]
+
+
+class TestRetry(ServerTestCase):
+
+    def testReadRetried(self):
+
+        answers = [(503, None), (502, None), (200, {"version": 1})]
+        self.server.answer = lambda request: answers.pop(0)
+        self.assertEqual(self.client.getServerSettings(), {"version": 1})
+        self.assertEqual(self.methods(), ["getServerSettings"] * 3)
+
+    def testCheckinNotRetried(self):
+
+        self.server.answer = lambda request: (503, None)
+        path = os.path.join(self.tmp, "model.ifc")
+        with open(path, "w") as f:
+            f.write("ISO-10303-21;\n")
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.client.checkin(1, "comment", 2, path)
+        self.assertEqual(self.methods(), ["checkin"])
+
+
+class TestCheckin(ServerTestCase):
+
+    def testBase64(self):
+
+        self.server.answer = lambda request: (200, 42)
+        path = os.path.join(self.tmp, "model.ifc")
+        data = os.urandom(3 * BIMServerClient.CHUNKSIZE + 1)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.assertEqual(self.client.checkinSync(1, "comment", 2, path, merge=True), 42)
+        parameters = self.server.calls[0]["parameters"]
+        self.assertEqual(base64.b64decode(parameters.pop("data")), data)
+        self.assertEqual(parameters, {"poid": 1, "comment": "comment", "deserializerOid": 2,
+                                      "fileSize": len(data), "fileName": "model.ifc", "merge": "true"})
+
+    def testTimeout(self):
+
+        # a check-in waits for the server to store the revision
+        self.client.timeout = (10, 0.2)
+        self.server.answer = lambda request: (200, 42)
+        self.server.delay = 0.5
+        path = os.path.join(self.tmp, "model.ifc")
+        with open(path, "w") as f:
+            f.write("ISO-10303-21;\n")
+        self.assertEqual(self.client.checkinSync(1, "comment", 2, path), 42)
+        # the retrying adapter reports read timeouts as connection errors
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.getServerSettings()
+
+
+class TestRevisions(ServerTestCase):
+
+    def setUp(self):
+
+        ServerTestCase.setUp(self)
+        self.revisions = dict([(oid, {"oid": oid, "comment": "revision %i" % oid}) for oid in range(100, 120)])
+        def answer(request):
+            if request["method"] == "getAllRevisionsOfProject":
+                return 200, list(self.revisions.values())
+            return 200, self.revisions[request["parameters"]["roid"]]
+        self.server.answer = answer
+        self.client.cache = BIMServerClient.BimServerCache(self.tmp, self.client.url)
+
+    def testColdCache(self):
+
+        roids = sorted(self.revisions)
+        self.assertEqual(list(self.client.getRevisions(roids, poid=1)), [(r, self.revisions[r]) for r in roids])
+        self.assertEqual(self.methods(), ["getAllRevisionsOfProject"])
+        self.assertEqual(list(self.client.getRevisions(roids, poid=1)), [(r, self.revisions[r]) for r in roids])
+        self.assertEqual(len(self.server.calls), 1)
+
+    def testOneMissing(self):
+
+        roids = sorted(self.revisions)
+        list(self.client.getRevisions(roids, poid=1))
+        self.client.cache.remove(os.path.join("revisions", "105.json"))
+        self.server.calls = []
+        self.assertEqual(list(self.client.getRevisions(roids, poid=1)), [(r, self.revisions[r]) for r in roids])
+        self.assertEqual(self.server.calls, [{"interface": "ServiceInterface", "method": "getRevision", "parameters": {"roid": 105}}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,225 @@
+"""Tests of GitBackend against real git repositories in temp folders"""
+
+import os, sys, shutil, tempfile, unittest
+
+try:
+    import git
+except ImportError:
+    # the FreeCAD running the tests may not have GitPython
+    git = None
+
+import GitBackend
+
+
+@unittest.skipIf(git is None, "GitPython is not installed")
+class RepoTestCase(unittest.TestCase):
+
+    """Creates a repo with a first commit of a.txt and b.txt"""
+
+    def setUp(self):
+
+        self.path = tempfile.mkdtemp()
+        self.repo = git.Repo.init(self.path)
+        with self.repo.config_writer() as config:
+            config.set_value("user", "name", "test")
+            config.set_value("user", "email", "test@example.com")
+        self.write("a.txt", "a\n")
+        self.write("b.txt", "b\n")
+        self.repo.git.add("--all")
+        self.repo.git.commit("-m", "first")
+
+    def tearDown(self):
+
+        self.repo.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def write(self, name, text):
+
+        with open(os.path.join(self.path, name), "w") as f:
+            f.write(text)
+
+    def commitAll(self):
+
+        """Stages and commits all the files of the status, like the panel"""
+
+        files = GitBackend.getStatus(self.repo).files
+        GitBackend.stage(self.repo, GitBackend.getStagePaths(files))
+        self.repo.git.commit("-m", "second")
+        return GitBackend.getStatus(self.repo)
+
+
+class TestStage(RepoTestCase):
+
+    def testStagedDeletion(self):
+
+        self.repo.git.rm("a.txt")
+        self.write("b.txt", "b2\n")
+        status = self.commitAll()
+        self.assertEqual(status.files, [])
+        self.assertEqual(self.repo.git.ls_files().split(), ["b.txt"])
+
+    def testStagedRename(self):
+
+        self.repo.git.mv("a.txt", "c.txt")
+        files = GitBackend.getStatus(self.repo).files
+        self.assertEqual([(f.index, f.path, f.origPath) for f in files], [("R", "c.txt", "a.txt")])
+        status = self.commitAll()
+        self.assertEqual(status.files, [])
+        self.assertEqual(self.repo.git.ls_files().split(), ["b.txt", "c.txt"])
+
+    def testStagedRenameModified(self):
+
+        self.repo.git.mv("a.txt", "c.txt")
+        self.write("c.txt", "c\n")
+        self.commitAll()
+        self.assertEqual(self.repo.git.show("HEAD:c.txt"), "c")
+
+    def testUnstagedDeletion(self):
+
+        os.remove(os.path.join(self.path, "a.txt"))
+        status = self.commitAll()
+        self.assertEqual(status.files, [])
+        self.assertEqual(self.repo.git.ls_files().split(), ["b.txt"])
+
+
+class TestLog(RepoTestCase):
+
+    def commit(self, name, text, message):
+
+        self.write(name, text)
+        self.repo.git.add("--all")
+        self.tick()
+        self.repo.git.commit("-m", message)
+
+    def tick(self):
+
+        # distinct dates, so both logs order the commits the same way
+        self.time = getattr(self, "time", 1500000000) + 60
+        date = "%i +0000" % self.time
+        os.environ["GIT_AUTHOR_DATE"] = os.environ["GIT_COMMITTER_DATE"] = date
+
+    def tearDown(self):
+
+        os.environ.pop("GIT_AUTHOR_DATE", None)
+        os.environ.pop("GIT_COMMITTER_DATE", None)
+        RepoTestCase.tearDown(self)
+
+    def testSimplification(self):
+
+        main = self.repo.active_branch.name
+        self.commit("f.txt", "1\n", "add f")
+        self.repo.git.checkout("-b", "side")
+        self.commit("f.txt", "side 1\n", "side change 1")
+        self.commit("f.txt", "side 2\n", "side change 2")
+        self.repo.git.checkout(main)
+        self.commit("f.txt", "2\n", "main change")
+        # a merge that keeps the version of f.txt of main
+        self.tick()
+        self.repo.git.merge("-s", "ours", "--no-edit", "side")
+        self.repo.git.checkout("-b", "other", "HEAD~1")
+        self.commit("f.txt", "other\n", "other change")
+        self.repo.git.checkout(main)
+        self.tick()
+        self.repo.git.merge("-X", "theirs", "--no-edit", "other")
+        self.commit("g.txt", "g\n", "add g")
+        with GitBackend.ObjectReader(self.repo) as reader:
+            for path in [None, "f.txt", "g.txt", "a.txt", "missing.txt"]:
+                args = ["--format=%H"] + (["--", path] if path else [])
+                expected = self.repo.git.log(*args).split()
+                self.assertEqual([c.sha for c in reader.log("HEAD", None, path)], expected, path)
+            self.assertEqual(len(list(reader.log("HEAD", 2, "f.txt"))), 2)
+
+
+class TestStatCache(RepoTestCase):
+
+    def testFiles(self):
+
+        os.mkdir(os.path.join(self.path, "sub"))
+        self.write("sub/c.txt", "c\n")
+        stats = GitBackend.StatCache(self.path)
+        dirs = stats.listDirectories()
+        self.assertEqual(dirs, ["", "sub"])
+        self.assertEqual(stats.listFiles(dirs), ["a.txt", "b.txt", "sub/c.txt"])
+        self.assertEqual(stats.listFiles(dirs, 2), ["a.txt", "b.txt"])
+        # a file written in place only changes its own entry
+        self.write("sub/c.txt", "c changed\n")
+        self.assertEqual(stats.scan("sub"), set(["sub/c.txt"]))
+
+
+# a stand-in for the git-lfs executable, implementing the commands used by
+# GitBackend on .gitattributes only, without storing any object
+LFS_STANDIN = """
+import sys, os, subprocess
+command, args = sys.argv[1], sys.argv[2:]
+lines = []
+if os.path.exists(".gitattributes"):
+    with open(".gitattributes") as f:
+        lines = f.read().splitlines()
+if command == "track":
+    if not args:
+        print("Listing tracked patterns")
+        for line in lines:
+            if "filter=lfs" in line.split():
+                print("    %s (.gitattributes)" % line.split()[0])
+    with open(".gitattributes", "a") as f:
+        for pattern in args:
+            line = pattern + " filter=lfs diff=lfs merge=lfs -text"
+            if not line in lines:
+                f.write(line + "\\n")
+elif command == "ls-files":
+    files = subprocess.check_output(["git", "ls-files", "-z"]).decode().split("\\0")
+    for path in files:
+        attr = subprocess.check_output(["git", "check-attr", "filter", "--", path]).decode() if path else ""
+        if attr.strip().endswith(": lfs"):
+            print("0123456789 * " + path)
+"""
+
+
+@unittest.skipIf(os.name == "nt", "the git-lfs stand-in is a script")
+class TestLFS(RepoTestCase):
+
+    def setUp(self):
+
+        RepoTestCase.setUp(self)
+        self.bin = tempfile.mkdtemp()
+        script = os.path.join(self.bin, "git-lfs")
+        with open(script, "w") as f:
+            f.write("#!" + sys.executable + "\n" + LFS_STANDIN)
+        os.chmod(script, 0o755)
+        self.path_env = os.environ["PATH"]
+        os.environ["PATH"] = self.bin + os.pathsep + self.path_env
+
+    def tearDown(self):
+
+        os.environ["PATH"] = self.path_env
+        shutil.rmtree(self.bin, ignore_errors=True)
+        RepoTestCase.tearDown(self)
+
+    def testTrack(self):
+
+        GitBackend.trackLFS(self.repo, ["*.FCStd", "*.step"])
+        self.assertEqual(GitBackend.getLFSPatterns(self.repo), ["*.FCStd", "*.step"])
+        self.assertEqual(self.repo.git.config("lfs.concurrenttransfers"), str(GitBackend.LFSTRANSFERS))
+        self.write("model.FCStd", "model")
+        self.write("part.step", "part")
+        self.repo.git.add("--all")
+        self.repo.git.commit("-m", "models")
+        self.assertEqual(GitBackend.getLFSFiles(self.repo), {"model.FCStd": True, "part.step": True})
+
+    def testPaths(self):
+
+        GitBackend.trackLFS(self.repo, ["*.FCStd"])
+        # more paths than fit on a command line, even on Linux
+        paths = ["folder %05i/%s.FCStd" % (i, "x" * 100) for i in range(25000)] + ["a.txt", "[1].FCStd"]
+        self.assertEqual(GitBackend.getLFSPaths(self.repo, paths), set(paths) - set(["a.txt"]))
+
+    def testFilters(self):
+
+        self.write(".gitattributes", "*.FCStd filter=fcstd diff=fcstd\n")
+        GitBackend.trackLFS(self.repo, ["*.step"])
+        filters = GitBackend.getFilters(self.repo, ["*.FCStd", "*.step", "*.ifc"])
+        self.assertEqual(filters, {"*.FCStd": "fcstd", "*.step": "lfs", "*.ifc": "unspecified"})
+
+
+if __name__ == "__main__":
+    unittest.main()
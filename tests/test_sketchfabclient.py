@@ -0,0 +1,119 @@
+"""Tests of SketchfabClient against a local HTTP server standing in for Sketchfab"""
+
+import os, json, shutil, tempfile, threading, unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import SketchfabClient
+from tools import multipart
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    """Accepts uploaded models and answers status requests with
+    server.status, a (code, headers, json) tuple"""
+
+    def do_POST(self):
+
+        length = int(self.headers["Content-Length"])
+        body = self.rfile.read(length)
+        self.server.uploads.append((self.headers["Content-Type"], length, body))
+        if len(body) < length:
+            # the client stopped sending
+            return
+        self.send_response(201)
+        self.send_header("Location", "http://127.0.0.1/v3/models/1234")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+
+        code, headers, data = self.server.status
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(code)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+
+        pass
+
+
+class ServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.server = HTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.server.uploads = []
+        self.server.status = (200, {}, {})
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = "http://127.0.0.1:%i/v3/models" % self.server.server_address[1]
+        self.client = SketchfabClient.SketchfabClient("token", self.url)
+        self.tmp = tempfile.mkdtemp()
+        self.model = os.path.join(self.tmp, "model.obj")
+        with open(self.model, "wb") as f:
+            f.write(os.urandom(200000))
+
+    def tearDown(self):
+
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class TestUpload(ServerTestCase):
+
+    def testUpload(self):
+
+        reports = []
+        url = self.client.upload(self.model, "name", tags=["freecad", "test"], progress=lambda done, total: reports.append((done, total)), chunksize=16384)
+        self.assertEqual(url, "http://127.0.0.1/v3/models/1234")
+        contentType, length, body = self.server.uploads[0]
+        self.assertTrue(contentType.startswith("multipart/form-data; boundary="))
+        with open(self.model, "rb") as f:
+            self.assertIn(f.read(), body)
+        # the progress counts the whole body, fields included
+        self.assertGreater(len(reports), 2)
+        self.assertEqual(reports[-1], (length, length))
+        self.assertTrue(all(done <= total == length for done, total in reports))
+
+    def testCancel(self):
+
+        reports = []
+        def progress(done, total):
+            reports.append((done, total))
+            if done:
+                self.client.cancel()
+        with self.assertRaises(multipart.Cancelled):
+            self.client.upload(self.model, "name", progress=progress, chunksize=16384)
+        # nothing was read after the cancel
+        self.assertEqual(len([r for r in reports if r[0]]), 1)
+        self.assertLess(reports[-1][0], reports[-1][1])
+
+    def testCancelBefore(self):
+
+        self.client.cancel()
+        with self.assertRaises(multipart.Cancelled):
+            self.client.upload(self.model, "name")
+
+
+class TestStatus(ServerTestCase):
+
+    def testStatus(self):
+
+        self.server.status = (200, {}, {"status": {"processing": "SUCCEEDED"}})
+        self.assertEqual(self.client.getStatus(self.url + "/1234"), ("SUCCEEDED", None))
+
+    def testBusy(self):
+
+        self.server.status = (429, {"Retry-After": "7"}, {})
+        self.assertEqual(self.client.getStatus(self.url + "/1234"), (None, 7))
+
+
+if __name__ == "__main__":
+    unittest.main()
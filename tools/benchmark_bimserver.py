@@ -0,0 +1,99 @@
+"""Benchmarks the pooled BimServerClient session against bare requests.post
+calls, using a local stub of the BimServer JSON API.
+
+    python -m tools.benchmark_bimserver [--calls 200] [--connect-delay 2]
+
+The stub server can delay every new connection by --connect-delay
+milliseconds, to simulate the TCP/TLS handshake cost of a remote server.
+"""
+
+import os, sys, json, time, threading, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_server(connect_delay):
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StubHandler(BaseHTTPRequestHandler):
+
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))["request"]
+            result = {"oid": 1, "comment": request["method"], "date": 0}
+            body = json.dumps({"response": {"result": result}}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class StubServer(ThreadingHTTPServer):
+
+        daemon_threads = True
+        connections = 0
+
+        def verify_request(self, request, client_address):
+            # called once per new connection
+            self.connections += 1
+            if connect_delay:
+                time.sleep(connect_delay)
+            return True
+
+    return StubServer(("127.0.0.1", 0), StubHandler)
+
+
+def bench_bare(url, calls):
+
+    import requests
+    data = {"token": "x", "request": {"interface": "ServiceInterface", "method": "getRevision", "parameters": {"roid": 1}}}
+    t = time.perf_counter()
+    for i in range(calls):
+        resp = requests.post(url+"/json", data=json.dumps(data))
+        resp.json()["response"]["result"]
+    return time.perf_counter() - t
+
+
+def bench_client(url, calls):
+
+    import BIMServerClient
+    t = time.perf_counter()
+    with BIMServerClient.BimServerClient(url, token="x") as client:
+        for i in range(calls):
+            client.getRevision(1)
+    return time.perf_counter() - t
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--connect-delay", type=float, default=2.0, help="milliseconds")
+    args = parser.parse_args()
+
+    server = make_server(args.connect_delay/1000.0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://%s:%i" % server.server_address
+    print("Stub BimServer at %s, %i calls, %.1f ms connect delay" % (url, args.calls, args.connect_delay))
+
+    for label, func in (("requests.post", bench_bare), ("BimServerClient", bench_client)):
+        server.connections = 0
+        elapsed = func(url, args.calls)
+        results = (label, elapsed, elapsed*1000.0/args.calls, server.connections)
+        print("%-16s %7.3f s total  %6.3f ms/call  %4i connections" % results)
+        if label == "requests.post":
+            bare = elapsed
+    saved = (bare - elapsed)*1000.0/args.calls
+    print("Saved %.3f ms per call (%.1f%%)" % (saved, 100.0*(bare-elapsed)/bare))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Compares repository size and clone time of a synthetic FCStd history
+stored as is and stored through the FCStdTools clean/smudge filter.
+
+    python -m tools.benchmark_fcstd_filter [--revisions 50] [--objects 500] [--shapes 20]
+
+Every revision changes the height of one object and a few vertices of one
+shape, like a typical modelling session.
+"""
+
+import os, sys, time, random, shutil, zipfile, tempfile, argparse, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_document(objects, heights):
+
+    lines = ["<?xml version='1.0' encoding='utf-8'?>",
+             "<Document SchemaVersion=\"4\" ProgramVersion=\"0.19\" FileVersion=\"1\">",
+             "<Objects Count=\"%i\">" % objects]
+    for i in range(objects):
+        lines.append("<Object type=\"Part::Box\" name=\"Box%i\" id=\"%i\"/>" % (i, i))
+    lines.append("</Objects>")
+    lines.append("<ObjectData Count=\"%i\">" % objects)
+    for i in range(objects):
+        lines.append("<Object name=\"Box%i\"><Properties Count=\"3\">" % i)
+        lines.append("<Property name=\"Label\" type=\"App::PropertyString\"><String value=\"Box %i\"/></Property>" % i)
+        lines.append("<Property name=\"Height\" type=\"App::PropertyLength\"><Float value=\"%s\"/></Property>" % heights[i])
+        lines.append("<Property name=\"Shape\" type=\"Part::PropertyPartShape\"><Part file=\"PartShape%i.brp\"/></Property>" % i)
+        lines.append("</Properties></Object>")
+    lines.append("</ObjectData>")
+    lines.append("</Document>")
+    return "\n".join(lines)
+
+
+def make_shape(rng, vertices):
+
+    return "\n".join(["%.15f %.15f %.15f" % (rng.random(), rng.random(), rng.random()) for i in range(vertices)])
+
+
+def write_fcstd(path, document, shapes):
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("Document.xml", document)
+        for i, shape in enumerate(shapes):
+            zf.writestr("PartShape%i.brp" % i, shape)
+
+
+def git(path, *args):
+
+    subprocess.check_call(["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com"] + list(args),
+                          cwd=path, stdout=subprocess.DEVNULL)
+
+
+def filter_config(command):
+
+    return ["filter.fcstd.clean=" + command + "clean", "filter.fcstd.smudge=" + command + "smudge"]
+
+
+def make_history(path, args, command):
+
+    """Commits args.revisions revisions of a model in a new repo at path,
+    through the filter if command is given"""
+
+    os.makedirs(path)
+    git(path, "init", "-q")
+    if command:
+        for option in filter_config(command):
+            key, value = option.split("=", 1)
+            git(path, "config", key, value)
+        with open(os.path.join(path, ".gitattributes"), "w") as f:
+            f.write("*.FCStd filter=fcstd diff=fcstd\n")
+        git(path, "add", ".gitattributes")
+    rng = random.Random(1)
+    heights = [1000] * args.objects
+    shapes = [make_shape(rng, args.vertices) for i in range(args.shapes)]
+    for r in range(args.revisions):
+        heights[rng.randrange(args.objects)] += 10
+        i = rng.randrange(args.shapes)
+        shape = shapes[i].split("\n")
+        for j in range(5):
+            shape[rng.randrange(len(shape))] = make_shape(rng, 1)
+        shapes[i] = "\n".join(shape)
+        write_fcstd(os.path.join(path, "model.FCStd"), make_document(args.objects, heights), shapes)
+        git(path, "add", "model.FCStd")
+        git(path, "commit", "-q", "-m", "Revision %i" % r)
+    git(path, "gc", "-q")
+
+
+def pack_size(path):
+
+    output = subprocess.check_output(["git", "count-objects", "-v"], cwd=path).decode()
+    sizes = dict([line.split(": ") for line in output.splitlines()])
+    return int(sizes["size-pack"]) + int(sizes["size"])
+
+
+def clone(path, target, command, checkout=True):
+
+    """Returns the time taken to clone path to target. The checkout of a
+    filtered repo runs the smudge filter, so it is timed separately from
+    the transfer of the objects"""
+
+    options = [] if checkout else ["--no-checkout"]
+    if command:
+        for option in filter_config(command):
+            options += ["-c", option]
+    t = time.perf_counter()
+    subprocess.check_call(["git", "clone", "-q", "--no-local"] + options + [path, target])
+    return time.perf_counter() - t
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--revisions", type=int, default=50)
+    parser.add_argument("--objects", type=int, default=500)
+    parser.add_argument("--shapes", type=int, default=20)
+    parser.add_argument("--vertices", type=int, default=5000, help="lines of each shape")
+    args = parser.parse_args()
+
+    script = os.path.join(ROOT, "FCStdTools.py").replace("\\", "/")
+    command = "\"" + sys.executable.replace("\\", "/") + "\" \"" + script + "\" "
+    tmp = tempfile.mkdtemp()
+    try:
+        print("%i revisions of a model with %i objects and %i shapes" % (args.revisions, args.objects, args.shapes))
+        for label, cmd in (("compressed", None), ("filtered", command)):
+            path = os.path.join(tmp, label)
+            t = time.perf_counter()
+            make_history(path, args, cmd)
+            elapsed = time.perf_counter() - t
+            size = pack_size(path)
+            transfer = clone(path, path + "-bare", cmd, checkout=False)
+            cloned = clone(path, path + "-clone", cmd)
+            print("%-11s repo %8i KiB  clone %6.2f s  without checkout %6.2f s  (history built in %.1f s)"
+                  % (label, size, cloned, transfer, elapsed))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
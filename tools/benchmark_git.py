@@ -0,0 +1,82 @@
+"""Benchmarks the persistent git cat-file processes of GitBackend against
+one git process per call, on a generated repository.
+
+    python -m tools.benchmark_git [--commits 5000] [--reads 200] [--path DIR]
+
+The repository is generated with git fast-import in a temporary folder (or
+in --path, where it is reused if it already exists). Requires GitPython.
+"""
+
+import os, sys, time, shutil, tempfile, argparse, subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_repo(path, commits):
+
+    """Creates a repo with the given number of commits, each one changing
+    one of 10 files"""
+
+    subprocess.check_call(["git", "init", "-q", path])
+    stream = []
+    t = 1500000000
+    for i in range(commits):
+        data = ("line %i\n" % i) * 20
+        message = "Commit %i" % i
+        stream.append("commit refs/heads/master")
+        stream.append("committer Bench <bench@example.com> %i +0000" % (t + i*60))
+        stream.append("data %i\n%s" % (len(message), message))
+        stream.append("M 644 inline file%i.txt" % (i % 10))
+        stream.append("data %i\n%s" % (len(data), data))
+    data = ("\n".join(stream) + "\n").encode("utf-8")
+    p = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=path, stdin=subprocess.PIPE)
+    p.communicate(data)
+    subprocess.check_call(["git", "symbolic-ref", "HEAD", "refs/heads/master"], cwd=path)
+    subprocess.check_call(["git", "checkout", "-q", "-f"], cwd=path)
+    with open(os.path.join(path, "file0.txt"), "a") as f:
+        f.write("changed\n")
+
+
+def timeit(func, count):
+
+    t = time.perf_counter()
+    for i in range(count):
+        func(i)
+    return time.perf_counter() - t
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--commits", type=int, default=5000)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--path", help="where to generate the repository")
+    args = parser.parse_args()
+
+    import git, GitBackend
+    path = args.path or tempfile.mkdtemp()
+    if not os.path.exists(os.path.join(path, ".git")):
+        t = time.perf_counter()
+        make_repo(path, args.commits)
+        print("Generated %i commits in %.1f s" % (args.commits, time.perf_counter()-t))
+    repo = git.Repo(path)
+    reader = GitBackend.ObjectReader(repo)
+    n = args.reads
+    tests = (
+        ("blob", lambda i: repo.git.show("HEAD~%i:file%i.txt" % (i, i % 10)),
+                 lambda i: reader.readBlob("HEAD~%i:file%i.txt" % (i, i % 10))),
+        ("log 25", lambda i: repo.git.log("-n 25", "--date=format:%Y.%m.%d", "--pretty=format:%ad %s"),
+                   lambda i: [c.getDate()+" "+c.summary for c in reader.log("HEAD", 25)]),
+    )
+    print("%i calls each" % n)
+    for label, percall, persistent in tests:
+        a = timeit(percall, n)
+        b = timeit(persistent, n)
+        print("%-8s process per call %7.3f ms  persistent %7.3f ms  (x%.1f)" % (label, a*1000/n, b*1000/n, a/b))
+    reader.close()
+    if not args.path:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
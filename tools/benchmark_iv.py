@@ -0,0 +1,145 @@
+"""Compares the old in-memory clean up of Open Inventor files exported by
+FreeCAD for Sketchfab with the streaming SketchfabClient.cleanInventor.
+
+    python -m tools.benchmark_iv [--size 500] [--keep]
+
+A file of about --size MB is generated, made of shapes like the ones
+FreeCAD writes: coordinates, then SoBrepFaceSet and SoBrepEdgeSet nodes
+with their selection fields. Each method runs in its own process, to
+measure its peak memory, and both outputs are compared.
+"""
+
+import os, sys, time, random, shutil, tempfile, argparse, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HEADER = "# Exported by FreeCAD v0.19 build24276\n# http://www.freecadweb.org\n\n"
+
+FACE_FIELDS = ("fields [ SFNode vertexProperty, MFInt32 coordIndex, MFInt32 materialIndex, MFInt32 normalIndex, "
+               "MFInt32 textureCoordIndex, MFInt32 partIndex, SFInt32 highlightIndex, MFInt32 selectionIndex ]")
+EDGE_FIELDS = ("fields [ SFNode vertexProperty, MFInt32 coordIndex, MFInt32 materialIndex, MFInt32 normalIndex, "
+               "MFInt32 textureCoordIndex, SFInt32 highlightIndex, MFInt32 selectionIndex ]")
+
+
+def make_shape(rng, vertices):
+
+    points = ",\n".join(["          %g %g %g" % (rng.random(), rng.random(), rng.random()) for i in range(vertices)])
+    faces = ",\n".join(["          %i, %i, %i, -1" % (i, i + 1, i + 2) for i in range(vertices - 2)])
+    edges = ",\n".join(["          %i, %i, -1" % (i, i + 1) for i in range(0, vertices - 1, 8)])
+    return ("  Separator {\n"
+            "    Coordinate3 {\n"
+            "      point [\n" + points + " ]\n"
+            "    }\n"
+            "    SoBrepFaceSet {\n"
+            "      " + FACE_FIELDS + "\n"
+            "      coordIndex [\n" + faces + " ]\n"
+            "      partIndex [ %i, %i ]\n"
+            "      highlightIndex -1\n"
+            "      selectionIndex -1\n"
+            "    }\n"
+            "    SoBrepEdgeSet {\n"
+            "      " + EDGE_FIELDS + "\n"
+            "      coordIndex [\n" + edges + " ]\n"
+            "      highlightIndex -1\n"
+            "      selectionIndex -1\n"
+            "    }\n"
+            "  }\n") % ((vertices - 2) // 2, (vertices - 2) - (vertices - 2) // 2)
+
+
+def make_file(path, size):
+
+    rng = random.Random(1)
+    shapes = [make_shape(rng, rng.randrange(100, 5000)).encode("ascii") for i in range(50)]
+    with open(path, "wb") as f:
+        f.write(b"#Inventor V2.1 ascii\n\nSeparator {\n")
+        written = 0
+        while written < size:
+            shape = shapes[rng.randrange(len(shapes))]
+            f.write(shape)
+            written += len(shape)
+        f.write(b"}\n")
+
+
+def clean_old(src, dst):
+
+    """The former code of Sketchfab.py, on text instead of bytes so it
+    runs on Python 3. Its last substitution wrote a backslash before the
+    closing bracket, it writes " ]" here as intended"""
+
+    import re
+    f = open(src, "r", encoding="latin-1")
+    s = f.read()
+    f.close()
+    s = s.replace("#Inventor V2.1 ascii", "#Inventor V2.1 ascii\n" + HEADER[:-1])
+    s = s.replace("SoBrepEdgeSet", "IndexedLineSet")
+    s = s.replace("SoBrepFaceSet", "IndexedFaceSet")
+    s = s.replace("SoBrepPointSet", "IndexedPointSet")
+    s = s.replace("\n", "--endl--")
+    s = re.sub(r"--endl--[ \t]+highlightIndex.*?--endl--", "--endl--", s)
+    s = re.sub(r"--endl--[ \t]+partIndex.*?--endl--", "--endl--", s)
+    s = re.sub(r"--endl--[ \t]+selectionIndex.*?--endl--", "--endl--", s)
+    s = re.sub(r"SFInt32 highlightIndex, ", "", s)
+    s = re.sub(r"MFInt32 partIndex, ", "", s)
+    s = re.sub(r"MFInt32 selectionIndex ", "", s)
+    s = re.sub(r", \]", " ]", s)
+    s = s.replace("--endl--", "\n")
+    f = open(dst, "w", encoding="latin-1", newline="")
+    f.write(s)
+    f.close()
+
+
+def clean_new(src, dst):
+
+    import SketchfabClient
+    SketchfabClient.cleanInventor(src, dst, HEADER.encode("ascii"))
+
+
+def run(method, src, dst):
+
+    """Runs a method in a child process, returns its time and peak memory"""
+
+    code = ("import sys, time, resource; sys.path.insert(0, %r); from tools import benchmark_iv; "
+            "t = time.perf_counter(); benchmark_iv.clean_%s(%r, %r); t = time.perf_counter() - t; "
+            "print(t, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)") % (ROOT, method, src, dst)
+    output = subprocess.check_output([sys.executable, "-c", code]).decode().split()
+    return float(output[0]), int(output[1]) >> 10
+
+
+def same(a, b, chunksize=1048576):
+
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        while True:
+            ca = fa.read(chunksize)
+            if ca != fb.read(chunksize):
+                return False
+            if not ca:
+                return True
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=500, help="size of the generated file in MB")
+    parser.add_argument("--keep", action="store_true", help="keep the generated files")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        src = os.path.join(tmp, "model.iv")
+        t = time.perf_counter()
+        make_file(src, args.size << 20)
+        print("%i MB Inventor file generated in %.1f s" % (os.path.getsize(src) >> 20, time.perf_counter() - t))
+        for method in ("old", "new"):
+            elapsed, peak = run(method, src, os.path.join(tmp, method + ".iv"))
+            print("%-4s %7.2f s  peak memory %6i MB" % (method, elapsed, peak))
+        print("identical output:", same(os.path.join(tmp, "old.iv"), os.path.join(tmp, "new.iv")))
+        if args.keep:
+            print("files kept in", tmp)
+    finally:
+        if not args.keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
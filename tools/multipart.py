@@ -0,0 +1,115 @@
+"""Streaming multipart/form-data encoder, used to upload big files to web
+services without loading them in memory. Doesn't depend on FreeCAD."""
+
+import os, uuid
+
+
+CHUNKSIZE = 1048576 # bytes between two progress reports
+
+
+class Cancelled(Exception):
+
+    """Raised from inside an upload when it has been cancelled"""
+
+
+class MultipartStream:
+
+    """A read-only file-like object that produces a multipart/form-data
+    body from a list of (name, value) fields and a list of (name, filename,
+    path) files. Instead of a path, a seekable binary file object can be
+    given, which is read from its start and left open. Files are read only
+    as the body is consumed, so memory use doesn't depend on their size.
+    The total length is known in advance, so it can be passed as data to
+    requests, which then sends it with a Content-Length header instead of
+    building it in memory.
+
+    If given, progress(done, total) is called every chunksize bytes and at
+    the end. The upload can be stopped with cancel(), from any thread,
+    after which the next read raises Cancelled."""
+
+    def __init__(self, fields=(), files=(), progress=None, chunksize=CHUNKSIZE, boundary=None):
+
+        self.boundary = boundary or uuid.uuid4().hex
+        self.contentType = "multipart/form-data; boundary=" + self.boundary
+        self.progress = progress
+        self.chunksize = chunksize
+        self.cancelled = False
+        # the body is a list of parts, either bytes, paths or file objects
+        self.parts = []
+        for name, value in fields:
+            self.parts.append(self.header(name) + b"\r\n" + str(value).encode("utf-8") + b"\r\n")
+        for name, filename, path in files:
+            self.parts.append(self.header(name, filename) + b"Content-Type: application/octet-stream\r\n\r\n")
+            self.parts.append(path)
+            self.parts.append(b"\r\n")
+        self.parts.append(("--" + self.boundary + "--\r\n").encode("ascii"))
+        self.length = 0
+        for part in self.parts:
+            if isinstance(part, bytes):
+                self.length += len(part)
+            elif isinstance(part, str):
+                self.length += os.path.getsize(part)
+            else:
+                part.seek(0, os.SEEK_END)
+                self.length += part.tell()
+                part.seek(0)
+        self.done = 0
+        self.reported = 0
+        self.index = 0
+        self.offset = 0 # position in the current bytes part
+        self.file = None # the open file of the current file part
+        self.opened = False # True if self.file was opened here
+
+    def header(self, name, filename=None):
+
+        disposition = "Content-Disposition: form-data; name=\"%s\"" % name
+        if filename:
+            disposition += "; filename=\"%s\"" % filename.replace("\"", "")
+        return ("--" + self.boundary + "\r\n" + disposition + "\r\n").encode("utf-8")
+
+    def __len__(self):
+
+        return self.length
+
+    def cancel(self):
+
+        self.cancelled = True
+
+    def close(self):
+
+        if self.file and self.opened:
+            self.file.close()
+        self.file = None
+
+    def read(self, size=-1):
+
+        """Returns up to size bytes of the body, b"" when it is over"""
+
+        if self.cancelled:
+            self.close()
+            raise Cancelled("Upload cancelled")
+        if (size is None) or (size < 0):
+            size = self.length
+        data = b""
+        while (len(data) < size) and (self.index < len(self.parts)):
+            part = self.parts[self.index]
+            if isinstance(part, bytes):
+                chunk = part[self.offset:self.offset + size - len(data)]
+                self.offset += len(chunk)
+                if self.offset >= len(part):
+                    self.index += 1
+                    self.offset = 0
+            else:
+                if not self.file:
+                    self.opened = isinstance(part, str)
+                    self.file = open(part, "rb") if self.opened else part
+                chunk = self.file.read(size - len(data))
+                if not chunk:
+                    self.close()
+                    self.index += 1
+            data += chunk
+        self.done += len(data)
+        if data and self.progress and ((self.done - self.reported >= self.chunksize) or (self.done == self.length)):
+            self.reported = self.done
+            self.progress(self.done, self.length)
+        return data